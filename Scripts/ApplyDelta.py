@@ -0,0 +1,164 @@
+import csv
+import os
+import pickle
+import sys
+from BPlusTree import BPlusTree, BPlusNode
+from DataFiles import parse_int, save_tree
+from GameTable import GameTable, review_score
+from PatriciaTree import SuffixTree
+from SuffixArray import SuffixArray
+
+
+# Aplica um delta (jogos novos, alterados e removidos) nas estruturas que já existem em Data/,
+# em vez de rodar BinaryDict.py/CsvToBin.py/ordering.py de novo sobre o catálogo inteiro.
+#
+#   python ApplyDelta.py delta.csv [tags_delta.csv] [categories_delta.csv]
+#
+# delta.csv tem as colunas de games.csv (app_id, name, release_date, price_overview, positive,
+# negative) e uma coluna opcional "action": "remove" (ou "delete") tira o app_id, qualquer
+# outro valor insere ou substitui a linha. Os deltas de tags/categorias têm as colunas de
+# tags.csv/categories.csv e trazem a lista completa de tags/categorias de cada app_id listado.
+# Só são regravadas as estruturas que mudaram; o ranks.bin o main.py refaz sozinho, já que
+# ele fica mais velho que as árvores.
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'Data')
+GAMES_BIN_PATH = os.path.join(DATA_DIR, 'games.bin')
+GAMES_TABLE_PATH = os.path.join(DATA_DIR, 'games.tbl')
+PATRICIA_PATH = os.path.join(DATA_DIR, 'patricia.bin')
+SUFFIX_ARRAY_PATH = os.path.join(DATA_DIR, 'names.sa')
+
+# árvore -> função que tira a chave de uma linha [name, release, price, positive, negative]
+SCALAR_TREES = {
+    "nametree": lambda row: row[0],
+    "pricetree": lambda row: row[2],
+    "releasetree": lambda row: row[1],
+    "reviewtree": lambda row: review_score(row[3], row[4]),
+}
+
+
+def read_delta(path):
+    upserts, removed = {}, set()
+    with open(path, "r", newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            app_id = int(row["app_id"])
+            if (row.get("action") or "").strip().lower() in ("remove", "delete"):
+                removed.add(app_id)
+                upserts.pop(app_id, None)
+                continue
+            removed.discard(app_id)
+            upserts[app_id] = [row["name"], parse_int(row.get("release_date"), 100000000),
+                               parse_int(row.get("price_overview"), 0), parse_int(row.get("positive"), 0),
+                               parse_int(row.get("negative"), 0)]
+    return upserts, removed
+
+
+def read_postings_delta(path, column):
+    # {app_id: [tags]} de um csv no formato de tags.csv/categories.csv
+    postings = {}
+    with open(path, "r", newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            postings.setdefault(int(row["app_id"]), []).append(row[column])
+    return postings
+
+
+def load_games():
+    if os.path.exists(GAMES_TABLE_PATH):
+        return GameTable.load(GAMES_TABLE_PATH)
+    with open(GAMES_BIN_PATH, "rb") as f:
+        return GameTable.from_dict(pickle.load(f))
+
+
+def load_tree(name):
+    with open(os.path.join(DATA_DIR, name + ".bin"), "rb") as f:
+        return pickle.load(f)
+
+
+def apply_scalar_tree(tree, key_of, old_rows, new_rows):
+    # uma entrada (chave, app_id) por jogo: jogos alterados mudam de chave com update,
+    # removidos saem e novos entram
+    changed = False
+    for app_id, row in old_rows.items():
+        if app_id not in new_rows:
+            changed |= tree.delete(key_of(row), app_id)
+        elif key_of(row) != key_of(new_rows[app_id]):
+            changed |= tree.update(key_of(row), key_of(new_rows[app_id]), app_id)
+    for app_id, row in new_rows.items():
+        if app_id not in old_rows:
+            tree.insert(key_of(row), app_id)
+            changed = True
+    return changed
+
+
+def apply_postings_tree(tree, purge, postings):
+    # tira os app_ids de purge de todas as listas e acrescenta as linhas novas
+    changed = False
+    if purge:
+        hits = [(key, app_id) for key, values in tree.iter_from() for app_id in purge if app_id in values]
+        for key, app_id in hits:
+            changed |= tree.delete(key, app_id)
+    for app_id, keys in postings.items():
+        for key in keys:
+            tree.add(key, app_id)
+            changed = True
+    return changed
+
+
+def main(argv):
+    if len(argv) < 2:
+        print("uso: python ApplyDelta.py delta.csv [tags_delta.csv] [categories_delta.csv]")
+        return 1
+    upserts, removed = read_delta(argv[1])
+    extra = {"tags": (argv[2], "tag") if len(argv) > 2 else None,
+             "categories": (argv[3], "category") if len(argv) > 3 else None}
+
+    games = load_games()
+    # só as colunas do csv; score e total são recalculados pela tabela
+    old_rows = {app_id: games.get(app_id)[:5] for app_id in set(upserts) | removed if app_id in games}
+    # linhas idênticas às atuais não mexem em nada
+    upserts = {app_id: row for app_id, row in upserts.items() if old_rows.get(app_id) != row}
+    old_rows = {app_id: row for app_id, row in old_rows.items() if app_id in upserts or app_id in removed}
+    print(f"{len(upserts)} jogos novos ou alterados, {len(removed & set(old_rows))} removidos")
+
+    if upserts or old_rows:
+        games = games.with_changes(upserts, removed)
+        games.save(GAMES_TABLE_PATH)
+        print("games.tbl atualizado")
+
+    for name, key_of in SCALAR_TREES.items():
+        if not os.path.exists(os.path.join(DATA_DIR, name + ".bin")):
+            continue
+        tree = load_tree(name)
+        if apply_scalar_tree(tree, key_of, old_rows, upserts):
+            save_tree(name, tree, DATA_DIR)
+            print(f"{name} atualizada")
+
+    for name, delta in extra.items():
+        postings = read_postings_delta(*delta) if delta else {}
+        purge = removed | set(postings)
+        if not (purge or postings) or not os.path.exists(os.path.join(DATA_DIR, name + ".bin")):
+            continue
+        tree = load_tree(name)
+        if apply_postings_tree(tree, purge, postings):
+            save_tree(name, tree, DATA_DIR)
+            print(f"{name} atualizada")
+
+    names_changed = {app_id for app_id in upserts if old_rows.get(app_id, [None])[0] != upserts[app_id][0]}
+    names_changed |= {app_id for app_id in removed if app_id in old_rows}
+    if names_changed and os.path.exists(PATRICIA_PATH):
+        index = SuffixTree.load_tree(PATRICIA_PATH)
+        for app_id in names_changed:
+            if app_id in old_rows:
+                index.remove_name(app_id, old_rows[app_id][0])
+            if app_id in upserts:
+                index.add_name(app_id, upserts[app_id][0])
+        index.save_tree(PATRICIA_PATH)
+        print("patricia.bin atualizada")
+    if names_changed and os.path.exists(SUFFIX_ARRAY_PATH):
+        # o suffix array é um vetor ordenado imutável, então é refeito a partir da tabela nova
+        names = ((app_id, games.name(i)) for i, app_id in enumerate(games.ids))
+        SuffixArray.build(names, processes=os.cpu_count()).save_tree(SUFFIX_ARRAY_PATH)
+        print("names.sa refeito")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
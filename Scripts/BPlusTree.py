@@ -1,3 +1,20 @@
+import mmap
+import os
+import pickle
+import struct
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from Bitmap import Bitmap
+
+# Formato paginado (.bpt): a página 0 guarda o cabeçalho e cada nó ocupa uma ou mais
+# páginas consecutivas de tamanho fixo. Os ponteiros (filhos e next das folhas) viram
+# offsets em bytes dentro do arquivo, então dá pra ler só os nós que a busca visita.
+PAGE_SIZE = 4096
+PAGED_MAGIC = b"BPT1"
+PAGED_VERSION = 2
+HEADER = struct.Struct("<4sHHIIQQ")     # magic, versão, folga, page_size, t, offset da raiz, offset da 1a folha
+NODE_HEADER = struct.Struct("<BxxxIQQ") # é folha, tamanho do payload, offsets da próxima e da anterior (0 == None)
+
 class BPlusNode:
     def __init__(self, t, leaf = False):
         self.t = t                              # grau mínimo
@@ -6,29 +23,80 @@ class BPlusNode:
         self.values = []                        # listas de listas de inteiros (lista dos app_ids que cada tag/categoria possu)
         self.leaf = leaf                        # booleano se e ou não uma folha
         self.next = None                        # ponteiro que liga uma folha na outra (vazio por padrão)
+        self.prev = None                        # ponteiro pra folha anterior, usado na iteração de trás pra frente
 
     # num máximo de chaves == 2t -1, retorna true se cheio
     def is_full(self):
         return len(self.keys) == 2 * self.t - 1
 
+    # o pickle seguiria next/prev de folha em folha, uma recursão por folha, e estoura o
+    # limite nas árvores de grau 200 com o catálogo inteiro; o BPlusTree refaz os ponteiros
+    def __getstate__(self):
+        state = dict(vars(self))
+        state["next"] = state["prev"] = None
+        return state
+
 
 class BPlusTree:
     def __init__(self, t):
         self.t = t
         self.root = BPlusNode(t, leaf=True)     # como no comço só tem root, ela já começa sendo uma folha
 
+    # acesso aos filhos e à próxima folha passa por aqui, assim a MappedBPlusTree
+    # consegue reaproveitar search/transverse_tree lendo os nós direto do disco
+    def _child(self, node, i):
+        return node.children[i]
+
+    def _next(self, node):
+        return node.next
+
+    def _prev(self, node):
+        return node.prev
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        # as folhas são salvas sem next/prev (e as de antes do prev não têm o prev), então
+        # refaz o encadeamento percorrendo a árvore da esquerda pra direita
+        prev = None
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if not node.leaf:
+                stack.extend(reversed(node.children))
+                continue
+            node.prev = prev
+            node.next = None
+            if prev is not None:
+                prev.next = node
+            prev = node
+
+    def save_paged(self, file_path, page_size = PAGE_SIZE):
+        write_paged(self, file_path, page_size)
+
     def search(self, key, node = None): # key é uma string, node é assumido como None inicialmente, depois a recursão usa outro valor
         if node is None:
             node = self.root
 
-        i = 0
-        while i < len(node.keys) and key > node.keys[i]:
-            i += 1
+        i = bisect_left(node.keys, key) # primeira posição com node.keys[i] >= key
 
         if node.leaf:
             # se folha, procura a chave
             if i < len(node.keys) and key == node.keys[i]:
                 return node.values[i]
+            # depois de deletes as cópias da chave do lado que a descida escolheu podem ter
+            # sumido, mas ainda sobrar alguma na folha vizinha (pulando folhas vazias)
+            if i == 0:
+                prev = self._prev(node)
+                while prev is not None and not prev.keys:
+                    prev = self._prev(prev)
+                if prev is not None and prev.keys[-1] == key:
+                    return prev.values[-1]
+            if i == len(node.keys):
+                nxt = self._next(node)
+                while nxt is not None and not nxt.keys:
+                    nxt = self._next(nxt)
+                if nxt is not None and nxt.keys[0] == key:
+                    return nxt.values[0]
             return None
         else:
             #print(i,len(node.keys))
@@ -40,7 +108,7 @@ class BPlusTree:
                 i += 1
 
             # nó interno, então desce no filho correto
-            return self.search(key, node.children[i])
+            return self.search(key, self._child(node, i))
 
     def insert(self, key, value_list): # insere na árvore, se existir dá um append
         root = self.root
@@ -53,13 +121,182 @@ class BPlusTree:
         else:
             self._insert_non_full(root, key, value_list)
 
-    def _insert_non_full(self, node, key, value_list):
-        i = len(node.keys) - 1
+    @classmethod
+    def bulk_load(cls, sorted_iterable, t, fill_factor = 1.0):
+        # Monta a árvore de uma vez a partir de pares (chave, valor) já ordenados pela chave:
+        # as folhas são preenchidas da esquerda pra direita e encadeadas, depois cada nível
+        # interno é montado em cima do anterior. Chaves repetidas viram entradas separadas,
+        # igual ao que o insert faz com as árvores de preço/data/review.
+        tree = cls(t)
+        per_leaf = max(t - 1, min(2 * t - 1, int((2 * t - 1) * fill_factor)))
+        per_node = max(t, min(2 * t, int(2 * t * fill_factor)))
 
-        if node.leaf:
-            while i >= 0 and key < node.keys[i]:
+        entries = list(sorted_iterable)
+
+        leaves = []
+        for group in _chunk(entries, per_leaf, t - 1, 2 * t - 1):
+            leaf = BPlusNode(t, leaf=True)
+            leaf.keys = [key for key, _ in group]
+            leaf.values = [value for _, value in group]
+            leaves.append(leaf)
+        for left, right in zip(leaves, leaves[1:]):
+            left.next = right
+            right.prev = left
+
+        # cada nível guarda (nó, menor chave da subárvore), que vira o separador no pai
+        level = [(leaf, leaf.keys[0] if leaf.keys else None) for leaf in leaves]
+        while len(level) > 1:
+            parents = []
+            for group in _chunk(level, per_node, t, 2 * t):
+                node = BPlusNode(t, leaf=False)
+                node.children = [child for child, _ in group]
+                node.keys = [low for _, low in group[1:]]
+                parents.append((node, group[0][1]))
+            level = parents
+
+        tree.root = level[0][0]
+        return tree
+
+    def _entries(self, key):
+        # (caminho, folha, índice) de cada entrada com essa chave, onde o caminho guarda
+        # (nó interno, índice do filho) da raiz até a folha, que o rebalanceamento usa pra
+        # achar pai e irmãos. Como chaves repetidas podem se espalhar por folhas vizinhas,
+        # começa na primeira folha que pode ter key e vai avançando o caminho pra direita
+        path = []
+        node = self.root
+        while not node.leaf:
+            i = bisect_left(node.keys, key)
+            path.append((node, i))
+            node = node.children[i]
+        i = bisect_left(node.keys, key)
+        while True:
+            while i < len(node.keys):
+                if node.keys[i] != key:
+                    return
+                yield path, node, i
+                i += 1
+            # sobe até o primeiro pai que ainda tem filho à direita e desce pela esquerda dele
+            while path and path[-1][1] == len(path[-1][0].children) - 1:
+                path.pop()
+            if not path:
+                return
+            parent, j = path.pop()
+            path.append((parent, j + 1))
+            node = parent.children[j + 1]
+            while not node.leaf:
+                path.append((node, 0))
+                node = node.children[0]
+            i = 0
+
+    def _locate(self, key, value):
+        for path, leaf, i in self._entries(key):
+            stored = leaf.values[i]
+            if stored == value or (isinstance(stored, (list, Bitmap)) and value in stored):
+                return path, leaf, i
+        return None
+
+    def delete(self, key, value):
+        # Remove o value guardado em key. Nas árvores de preço/data/review cada entrada é um
+        # app_id, então some a entrada inteira; nas de tags/categorias o app_id sai da lista
+        # (e a entrada some junto se a lista esvaziar). Retorna True se achou o value.
+        found = self._locate(key, value)
+        if found is None:
+            return False
+        path, leaf, i = found
+        stored = leaf.values[i]
+        if stored != value:
+            stored = _without(stored, value)
+            if stored:
+                leaf.values[i] = stored
+                return True
+        del leaf.keys[i]
+        del leaf.values[i]
+        self._rebalance(path, leaf)
+        return True
+
+    def update(self, old_key, new_key, value):
+        # move value de old_key pra new_key (ex.: o preço de um jogo mudou), mantendo o
+        # formato da árvore: entrada própria nas escalares, lista/Bitmap nas de tags
+        found = self._locate(old_key, value)
+        if found is None:
+            return False
+        path, leaf, i = found
+        posting = isinstance(leaf.values[i], (list, Bitmap))
+        self.delete(old_key, value)
+        if posting:
+            self.add(new_key, value)
+        else:
+            self.insert(new_key, value)
+        return True
+
+    def add(self, key, value):
+        # acrescenta value na lista (ou Bitmap) de app_ids de key, criando a entrada se precisar
+        for _, node, i in self._entries(key):
+            stored = node.values[i]
+            if isinstance(stored, Bitmap):
+                node.values[i] = stored | Bitmap.from_iterable([value])
+            elif value not in stored:
+                stored.append(value)
+            return
+        self.insert(key, [value])
+
+    def _rebalance(self, path, node):
+        # Depois de uma remoção, node pode ter ficado abaixo do mínimo (t-1 chaves). Pega uma
+        # chave emprestada de um irmão que tenha sobra ou junta com ele; a junção tira um
+        # separador do pai, então o pai pode precisar do mesmo tratamento, subindo o caminho.
+        t = self.t
+        while path and len(node.keys) < t - 1:
+            parent, i = path.pop()
+            left = parent.children[i - 1] if i > 0 else None
+            right = parent.children[i + 1] if i + 1 < len(parent.children) else None
+
+            if left is not None and len(left.keys) > t - 1:
+                if node.leaf:
+                    node.keys.insert(0, left.keys.pop())
+                    node.values.insert(0, left.values.pop())
+                    parent.keys[i - 1] = node.keys[0]
+                else:
+                    node.keys.insert(0, parent.keys[i - 1])
+                    node.children.insert(0, left.children.pop())
+                    parent.keys[i - 1] = left.keys.pop()
+                return
+            if right is not None and len(right.keys) > t - 1:
+                if node.leaf:
+                    node.keys.append(right.keys.pop(0))
+                    node.values.append(right.values.pop(0))
+                    parent.keys[i] = right.keys[0]
+                else:
+                    node.keys.append(parent.keys[i])
+                    node.children.append(right.children.pop(0))
+                    parent.keys[i] = right.keys.pop(0)
+                return
+
+            # nenhum irmão tem sobra: junta o par (esquerda, direita) no da esquerda
+            if left is not None:
                 i -= 1
-            idx = i + 1
+                left, right = left, node
+            else:
+                left, right = node, right
+            if left.leaf:
+                left.keys += right.keys
+                left.values += right.values
+                left.next = right.next # a folha da direita sai do encadeamento
+                if right.next is not None:
+                    right.next.prev = left
+            else:
+                left.keys += [parent.keys[i]] + right.keys
+                left.children += right.children
+            del parent.keys[i]
+            del parent.children[i + 1]
+            node = parent
+
+        # a raiz interna que ficou sem chaves é trocada pelo seu único filho
+        if not self.root.leaf and not self.root.keys:
+            self.root = self.root.children[0]
+
+    def _insert_non_full(self, node, key, value_list):
+        if node.leaf:
+            idx = bisect_right(node.keys, key) # depois das chaves iguais, como no laço antigo
 
             if idx < len(node.keys) and node.keys[idx] == key:
                 node.values[idx].append(value_list)
@@ -68,9 +305,7 @@ class BPlusTree:
             node.keys.insert(idx, key)
             node.values.insert(idx, value_list)
         else:
-            while i >= 0 and key < node.keys[i]:
-                i -= 1
-            i += 1
+            i = bisect_right(node.keys, key)
 
             if node.children[i].is_full():
                 self._split_child(node, i, node.children[i])
@@ -91,6 +326,9 @@ class BPlusTree:
 
             new_child.next = full_child.next # aqui ocorre a encadeação das folhas
             full_child.next = new_child
+            new_child.prev = full_child
+            if new_child.next is not None:
+                new_child.next.prev = new_child
 
             parent.keys.insert(idx, new_child.keys[0]) # a primeira chave a direita é copiada para o pai, assim na busca ainda é possível acessar o valor dela como folha
             parent.children.insert(idx + 1, new_child)
@@ -107,6 +345,44 @@ class BPlusTree:
             parent.keys.insert(idx, promoted)
             parent.children.insert(idx + 1, new_child)
 
+    def check_invariants(self):
+        # Confere a estrutura inteira e levanta ValueError no primeiro problema: chaves
+        # ordenadas, ocupação entre o mínimo e o máximo (a raiz é exceção), separadores
+        # delimitando as subárvores, todas as folhas na mesma profundidade e o encadeamento
+        # next/prev batendo com a ordem das folhas. Usado pelo stress_bplustree.py.
+        t = self.t
+        leaves = []
+
+        def visit(node, lo, hi, depth, is_root):
+            keys = node.keys
+            if any(a > b for a, b in zip(keys, keys[1:])):
+                raise ValueError(f"chaves fora de ordem em {keys}")
+            if keys and ((lo is not None and keys[0] < lo) or (hi is not None and keys[-1] > hi)):
+                raise ValueError(f"chaves {keys[0]!r}..{keys[-1]!r} fora do intervalo [{lo!r}, {hi!r}]")
+            if len(keys) > 2 * t - 1 or (not is_root and len(keys) < t - 1):
+                raise ValueError(f"nó com {len(keys)} chaves, fora de [{t - 1}, {2 * t - 1}]")
+            if node.leaf:
+                if len(node.values) != len(keys):
+                    raise ValueError("folha com número de valores diferente do de chaves")
+                leaves.append((node, depth))
+                return
+            if len(node.children) != len(keys) + 1:
+                raise ValueError("nó interno com número de filhos diferente de chaves + 1")
+            if is_root and not keys:
+                raise ValueError("raiz interna sem chaves")
+            bounds = [lo] + keys + [hi]
+            for i, child in enumerate(node.children):
+                visit(child, bounds[i], bounds[i + 1], depth + 1, False)
+
+        visit(self.root, None, None, 0, True)
+        if len({depth for _, depth in leaves}) > 1:
+            raise ValueError("folhas em profundidades diferentes")
+        for i, (leaf, _) in enumerate(leaves):
+            expected_prev = leaves[i - 1][0] if i > 0 else None
+            expected_next = leaves[i + 1][0] if i + 1 < len(leaves) else None
+            if leaf.prev is not expected_prev or leaf.next is not expected_next:
+                raise ValueError(f"encadeamento next/prev quebrado na folha {i}")
+
     def print_tree(self, node= None, lvl= 0):
         if node is None:
             node = self.root
@@ -121,14 +397,84 @@ class BPlusTree:
             print(f"{indent}{debug}")
         else:
             print(f"{indent}{node.keys}")
-            for child in node.children:
-                self.print_tree(child, lvl + 1)
+            for i in range(len(node.children)):
+                self.print_tree(self._child(node, i), lvl + 1)
     
+    def _leaf_for(self, key, upper):
+        # desce até a folha onde key começaria (upper=False) ou terminaria (upper=True);
+        # com chaves repetidas elas podem estar espalhadas em folhas vizinhas
+        node = self.root
+        while not node.leaf:
+            i = bisect_right(node.keys, key) if upper else bisect_left(node.keys, key)
+            node = self._child(node, i)
+        return node
+
+    def _edge_leaf(self, last):
+        node = self.root
+        while not node.leaf:
+            node = self._child(node, len(node.children) - 1 if last else 0)
+        return node
+
+    def iter_from(self, key = None, reverse = False):
+        # gerador preguiçoso de pares (chave, valor) a partir de key (inclusive),
+        # seguindo next, ou prev quando reverse. key None começa de uma das pontas
+        if not reverse:
+            node = self._edge_leaf(False) if key is None else self._leaf_for(key, False)
+            i = 0 if key is None else bisect_left(node.keys, key)
+            while node is not None:
+                for j in range(i, len(node.keys)):
+                    yield node.keys[j], node.values[j]
+                node = self._next(node)
+                i = 0
+        else:
+            node = self._edge_leaf(True) if key is None else self._leaf_for(key, True)
+            i = len(node.keys) - 1 if key is None else bisect_right(node.keys, key) - 1
+            while node is not None:
+                for j in range(i, -1, -1):
+                    yield node.keys[j], node.values[j]
+                node = self._prev(node)
+                if node is not None:
+                    i = len(node.keys) - 1
+
+    def range(self, lo = None, hi = None, reverse = False):
+        # pares com lo <= chave <= hi (None deixa o lado aberto), O(log n + k)
+        if not reverse:
+            for key, value in self.iter_from(lo):
+                if hi is not None and key > hi:
+                    return
+                yield key, value
+        else:
+            for key, value in self.iter_from(hi, reverse=True):
+                if lo is not None and key < lo:
+                    return
+                yield key, value
+
+    def _position(self, key, upper):
+        # fração aproximada das entradas que ficam antes de key, olhando só o caminho
+        # da raiz até a folha: cada nível divide a faixa do nó entre os filhos
+        node = self.root
+        low, width = 0.0, 1.0
+        while not node.leaf:
+            i = bisect_right(node.keys, key) if upper else bisect_left(node.keys, key)
+            width /= len(node.children)
+            low += i * width
+            node = self._child(node, i)
+        if node.keys:
+            i = bisect_right(node.keys, key) if upper else bisect_left(node.keys, key)
+            low += width * i / len(node.keys)
+        return low
+
+    def estimate_range(self, lo = None, hi = None):
+        # estimativa O(log n) da fração das entradas com lo <= chave <= hi, sem percorrer as folhas
+        start = 0.0 if lo is None else self._position(lo, False)
+        end = 1.0 if hi is None else self._position(hi, True)
+        return max(0.0, end - start)
+
     def transverse_tree(self, app_id_set):
         ordered_ids = []
         node = self.root
         while not node.leaf:
-            node = node.children[0]
+            node = self._child(node, 0)
         
         while node is not None:
             for value in node.values:
@@ -141,5 +487,142 @@ class BPlusTree:
                 elif isinstance(value, int):
                     if value in app_id_set:
                         ordered_ids.append(value)
-            node = node.next
+            node = self._next(node)
         return ordered_ids
+
+
+
+def _without(values, value):
+    # lista (ou Bitmap) de app_ids sem value
+    if isinstance(values, Bitmap):
+        return values - Bitmap.from_iterable([value])
+    return [v for v in values if v != value]
+
+def _chunk(items, size, minimum, maximum):
+    # corta em grupos de `size`; se o último ficar abaixo do mínimo, junta com o penúltimo
+    # (ou divide os dois ao meio quando a soma passa do máximo de um nó)
+    groups = [items[i:i + size] for i in range(0, len(items), size)] or [[]]
+    if len(groups) > 1 and len(groups[-1]) < minimum:
+        merged = groups[-2] + groups[-1]
+        if len(merged) <= maximum:
+            groups[-2:] = [merged]
+        else:
+            half = len(merged) // 2
+            groups[-2:] = [merged[:half], merged[half:]]
+    return groups
+
+def _pages_needed(payload_len, page_size):
+    return -(-(NODE_HEADER.size + payload_len) // page_size)
+
+def write_paged(tree, file_path, page_size = PAGE_SIZE):
+    # separa os nós por nível, as folhas ficam todas no último
+    levels = [[tree.root]]
+    while not levels[-1][0].leaf:
+        levels.append([child for node in levels[-1] for child in node.children])
+
+    offsets = {}                    # id(nó) -> offset no arquivo
+    pages = []                      # (offset, nó, payload) na ordem em que vão pro disco
+    next_offset = page_size         # a página 0 é do cabeçalho
+
+    # o payload das folhas não depende de offsets, então dá pra saber onde cada uma vai
+    # ficar antes de escrever, e o next de cada folha já sai resolvido
+    for node in levels[-1]:
+        payload = pickle.dumps((node.keys, node.values), pickle.HIGHEST_PROTOCOL)
+        offsets[id(node)] = next_offset
+        pages.append((next_offset, node, payload))
+        next_offset += _pages_needed(len(payload), page_size) * page_size
+
+    # níveis internos de baixo pra cima: os filhos de um nível já têm offset
+    for level in reversed(levels[:-1]):
+        for node in level:
+            children = [offsets[id(child)] for child in node.children]
+            payload = pickle.dumps((node.keys, children), pickle.HIGHEST_PROTOCOL)
+            offsets[id(node)] = next_offset
+            pages.append((next_offset, node, payload))
+            next_offset += _pages_needed(len(payload), page_size) * page_size
+
+    # escreve num arquivo temporário e troca no fim: quem estiver com o .bpt antigo
+    # mapeado continua lendo o arquivo antigo até reabrir
+    with open(file_path + ".tmp", "wb") as f:
+        header = HEADER.pack(PAGED_MAGIC, PAGED_VERSION, 0, page_size, tree.t,
+                             offsets[id(tree.root)], offsets[id(levels[-1][0])])
+        f.write(header.ljust(page_size, b"\0"))
+        for offset, node, payload in pages:
+            nxt = offsets[id(node.next)] if node.leaf and node.next is not None else 0
+            prv = offsets[id(node.prev)] if node.leaf and node.prev is not None else 0
+            data = NODE_HEADER.pack(node.leaf, len(payload), nxt, prv) + payload
+            f.write(data.ljust(_pages_needed(len(payload), page_size) * page_size, b"\0"))
+    os.replace(file_path + ".tmp", file_path)
+
+
+class MappedNode:
+    # nó decodificado de uma página; children, next e prev guardam offsets e não objetos
+    __slots__ = ("keys", "values", "children", "leaf", "next", "prev")
+
+    def __init__(self, leaf, keys, payload, next_offset, prev_offset):
+        self.leaf = leaf
+        self.keys = keys
+        self.values = payload if leaf else []
+        self.children = [] if leaf else payload
+        self.next = next_offset
+        self.prev = prev_offset
+
+
+class MappedBPlusTree(BPlusTree):
+    # Árvore somente leitura sobre um arquivo .bpt aberto com mmap. Só os nós que
+    # search/transverse_tree tocam são decodificados, e como o mapeamento é do
+    # próprio arquivo, vários processos dividem as mesmas páginas do page cache.
+    def __init__(self, file_path, cache_size = 1024):
+        self._file = open(file_path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, self.page_size, self.t, self._root_offset, self._first_leaf = HEADER.unpack_from(self._mm, 0)
+        if magic != PAGED_MAGIC or version != PAGED_VERSION:
+            self.close()
+            raise ValueError(f"{file_path} não é um arquivo .bpt versão {PAGED_VERSION}")
+        self._node = lru_cache(maxsize=cache_size)(self._read_node)
+
+    def _read_node(self, offset):
+        leaf, size, next_offset, prev_offset = NODE_HEADER.unpack_from(self._mm, offset)
+        start = offset + NODE_HEADER.size
+        keys, payload = pickle.loads(self._mm[start:start + size])
+        return MappedNode(bool(leaf), keys, payload, next_offset, prev_offset)
+
+    @property
+    def root(self):
+        return self._node(self._root_offset)
+
+    def _child(self, node, i):
+        return self._node(node.children[i])
+
+    def _next(self, node):
+        return self._node(node.next) if node.next else None
+
+    def _prev(self, node):
+        return self._node(node.prev) if node.prev else None
+
+    def insert(self, key, value_list):
+        raise TypeError("MappedBPlusTree é somente leitura, use BPlusTree e save_paged")
+
+    def delete(self, key, value):
+        raise TypeError("MappedBPlusTree é somente leitura, use BPlusTree e save_paged")
+
+    def update(self, old_key, new_key, value):
+        raise TypeError("MappedBPlusTree é somente leitura, use BPlusTree e save_paged")
+
+    def add(self, key, value):
+        raise TypeError("MappedBPlusTree é somente leitura, use BPlusTree e save_paged")
+
+    # os métodos abaixo andam por node.children e node.next como objetos, mas aqui eles são
+    # offsets no arquivo; eles só fazem sentido na BPlusTree carregada do .bin
+    def _entries(self, key):
+        raise TypeError("MappedBPlusTree é somente leitura, use BPlusTree e save_paged")
+
+    def check_invariants(self):
+        raise TypeError("MappedBPlusTree não confere invariantes, carregue o .bin numa BPlusTree")
+
+    def save_paged(self, file_path, page_size = PAGE_SIZE):
+        raise TypeError("MappedBPlusTree já é um .bpt, gere o arquivo a partir da BPlusTree do .bin")
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
@@ -0,0 +1,19 @@
+import os
+import pickle
+from BPlusTree import BPlusTree, BPlusNode
+
+
+# Converte as árvores B+ em pickle (.bin) para o formato paginado (.bpt) que o
+# main.py abre com mmap. Rode de novo sempre que algum .bin for regerado.
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'Data')
+TREES = ["categories", "tags", "nametree", "pricetree", "releasetree", "reviewtree"]
+
+for name in TREES:
+    bin_path = os.path.join(DATA_DIR, name + ".bin")
+    if not os.path.exists(bin_path):
+        print(f"{name}.bin não encontrado, pulando")
+        continue
+    with open(bin_path, "rb") as f:
+        tree = pickle.load(f)
+    tree.save_paged(os.path.join(DATA_DIR, name + ".bpt"))
+    print(f"{name}.bin -> {name}.bpt")
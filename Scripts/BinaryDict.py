@@ -2,6 +2,7 @@ import csv
 from collections import defaultdict
 import pickle
 from BPlusTree import BPlusTree, BPlusNode
+from GameTable import GameTable
 
 
 category_dict = defaultdict(list)
@@ -35,6 +36,10 @@ with open("Data/games.csv", "r", newline='', encoding='utf-8') as f,\
         category_dict[row["app_id"]].extend(data)
     pickle.dump(category_dict,bin)
 
+# versão colunar do mesmo dicionário, que o main.py abre com mmap (se este bloco continuar
+# comentado, o main.py e o ordering.py convertem o games.bin quando precisarem)
+GameTable.from_dict(category_dict).save("Data/games.tbl")
+
 """
 with open("Data/games.bin", "rb") as f:
     d = pickle.load(f)
@@ -0,0 +1,175 @@
+from array import array
+
+# Roaring-style compressed bitmap of app_ids. Ids are split by their high 16 bits
+# into chunks; a chunk with few ids is a sorted array('H') of the low 16 bits, and a
+# chunk with more than ARRAY_MAX ids becomes a dense 8 KiB bitset. Dense chunks are
+# combined as Python ints, so AND/OR/AND NOT of large posting lists run in C.
+ARRAY_MAX = 4096
+DENSE_BYTES = 1 << 13
+
+def _dense_from_lows(lows):
+    bits = bytearray(DENSE_BYTES)
+    for low in lows:
+        bits[low >> 3] |= 1 << (low & 7)
+    return bytes(bits)
+
+def _lows_from_dense(bits):
+    lows = array('H')
+    for i, word in enumerate(memoryview(bits).cast('Q')):
+        base = i << 6
+        while word:
+            lowest = word & -word
+            lows.append(base + lowest.bit_length() - 1)
+            word ^= lowest
+    return lows
+
+def _from_int(value):
+    # Result of an int operation on dense chunks, back into the smaller container
+    if not value:
+        return None
+    if value.bit_count() <= ARRAY_MAX:
+        return _lows_from_dense(value.to_bytes(DENSE_BYTES, 'little'))
+    return value.to_bytes(DENSE_BYTES, 'little')
+
+def _as_int(container):
+    if isinstance(container, bytes):
+        return int.from_bytes(container, 'little')
+    return int.from_bytes(_dense_from_lows(container), 'little')
+
+def _count(container):
+    if isinstance(container, bytes):
+        return int.from_bytes(container, 'little').bit_count()
+    return len(container)
+
+def _has(container, low):
+    if isinstance(container, bytes):
+        return container[low >> 3] >> (low & 7) & 1 == 1
+    lo, hi = 0, len(container)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if container[mid] < low:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo < len(container) and container[lo] == low
+
+def _and(a, b):
+    if isinstance(a, bytes) and isinstance(b, bytes):
+        return _from_int(_as_int(a) & _as_int(b))
+    if isinstance(a, bytes):
+        a, b = b, a
+    if isinstance(b, bytes):
+        lows = array('H', [low for low in a if _has(b, low)])
+    else:
+        small, large = (a, b) if len(a) <= len(b) else (b, a)
+        lows = array('H', sorted(set(small).intersection(large)))
+    return lows or None
+
+def _or(a, b):
+    if isinstance(a, bytes) or isinstance(b, bytes) or len(a) + len(b) > ARRAY_MAX:
+        return _from_int(_as_int(a) | _as_int(b))
+    return array('H', sorted(set(a).union(b)))
+
+def _andnot(a, b):
+    if isinstance(a, bytes):
+        return _from_int(_as_int(a) & ~_as_int(b))
+    if isinstance(b, bytes):
+        lows = array('H', [low for low in a if not _has(b, low)])
+    else:
+        remove = set(b)
+        lows = array('H', [low for low in a if low not in remove])
+    return lows or None
+
+
+# Trees built before the bitmap postings still hold plain lists of app_ids
+def as_bitmap(ids):
+    if not ids:
+        return None
+    return ids if isinstance(ids, Bitmap) else Bitmap.from_iterable(ids)
+
+
+class Bitmap:
+    __slots__ = ('chunks', '_len')
+
+    def __init__(self, chunks=None):
+        self.chunks = chunks if chunks is not None else {}  # high 16 bits -> container
+        self._len = sum(_count(c) for c in self.chunks.values())
+
+    @staticmethod
+    def from_iterable(app_ids):
+        groups = {}
+        for app_id in sorted(set(app_ids)):
+            groups.setdefault(app_id >> 16, []).append(app_id & 0xFFFF)
+        chunks = {}
+        for high, lows in groups.items():
+            chunks[high] = _dense_from_lows(lows) if len(lows) > ARRAY_MAX else array('H', lows)
+        return Bitmap(chunks)
+
+    def __len__(self):
+        return self._len
+
+    def __bool__(self):
+        return self._len > 0
+
+    def __contains__(self, app_id):
+        container = self.chunks.get(app_id >> 16)
+        return container is not None and _has(container, app_id & 0xFFFF)
+
+    def __iter__(self):
+        for high in sorted(self.chunks):
+            container = self.chunks[high]
+            lows = _lows_from_dense(container) if isinstance(container, bytes) else container
+            base = high << 16
+            for low in lows:
+                yield base + low
+
+    def __and__(self, other):
+        if len(other.chunks) < len(self.chunks):
+            self, other = other, self
+        chunks = {}
+        for high, container in self.chunks.items():
+            if high in other.chunks:
+                result = _and(container, other.chunks[high])
+                if result is not None:
+                    chunks[high] = result
+        return Bitmap(chunks)
+
+    def __or__(self, other):
+        chunks = dict(self.chunks)
+        for high, container in other.chunks.items():
+            chunks[high] = _or(chunks[high], container) if high in chunks else container
+        return Bitmap(chunks)
+
+    def __sub__(self, other):
+        chunks = {}
+        for high, container in self.chunks.items():
+            if high in other.chunks:
+                container = _andnot(container, other.chunks[high])
+            if container is not None:
+                chunks[high] = container
+        return Bitmap(chunks)
+
+    # Everything in universe that is not in this bitmap
+    def negate(self, universe):
+        return universe - self
+
+    # Intersection of all bitmaps, smallest first, stopping as soon as it is empty
+    @staticmethod
+    def intersect_all(bitmaps):
+        bitmaps = sorted(bitmaps, key=len)
+        if not bitmaps:
+            return Bitmap()
+        result = bitmaps[0]
+        for bitmap in bitmaps[1:]:
+            if not result:
+                break
+            result = result & bitmap
+        return result
+
+    # Union of all bitmaps
+    @staticmethod
+    def union_all(bitmaps):
+        result = Bitmap()
+        for bitmap in bitmaps:
+            result = result | bitmap
+        return result
@@ -2,6 +2,7 @@ import csv
 from collections import defaultdict
 import pickle
 from BPlusTree import BPlusTree, BPlusNode
+from Bitmap import Bitmap
         
 
 # Dicionário temporário onde as tags/categorias são chaves e os valores são listas de app_ids
@@ -13,10 +14,9 @@ with open("Data/tags.csv", "r", newline='', encoding='utf-8') as csvfile:
         app_id = row["app_id"]
         category = row["tag"]
         category_dict[category].append(int(app_id))
-    chaves = list(category_dict.keys()) #lista de todas as tags
-    tree = BPlusTree(t=7) #inicia uma árvore de grau 7 e ordem 8, assim tem um máximo de 3 níveis
-    for key in chaves:
-        tree.insert(key,category_dict[key])
+    chaves = sorted(category_dict.keys()) #lista de todas as tags, já ordenada pro bulk_load
+    # cada lista de app_ids vira um bitmap comprimido, que o main.py intersecta sem montar sets
+    tree = BPlusTree.bulk_load(((key, Bitmap.from_iterable(category_dict[key])) for key in chaves), t=7) #árvore de grau 7 e ordem 8, assim tem um máximo de 3 níveis
     
 with open("Data/tags.bin", "wb") as f:
     pickle.dump(tree,f)
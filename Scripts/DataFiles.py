@@ -0,0 +1,25 @@
+import os
+import pickle
+
+
+# Funções comuns aos scripts que geram ou atualizam os arquivos de Data/ (Ingest.py e
+# ApplyDelta.py), para um script não precisar importar o outro.
+
+
+def parse_int(value, default):
+    # mesmos padrões do BinaryDict.py para campos vazios ou inválidos
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def save_tree(name, tree, data_dir, paged=False):
+    # grava o .bin num temporário e troca, e refaz o .bpt se ele já existia (ou se paged)
+    bin_path = os.path.join(data_dir, name + ".bin")
+    with open(bin_path + ".tmp", "wb") as f:
+        pickle.dump(tree, f)
+    os.replace(bin_path + ".tmp", bin_path)
+    paged_path = os.path.join(data_dir, name + ".bpt")
+    if paged or os.path.exists(paged_path):
+        tree.save_paged(paged_path)
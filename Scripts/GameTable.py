@@ -0,0 +1,196 @@
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+
+# games.tbl layout: a header, then one section per column, each starting on an 8 byte
+# boundary. Every column is a plain little-endian array, so load() can map the file
+# and read the columns in place through memoryviews instead of unpickling a dict.
+TABLE_MAGIC = b"GTB1"
+TABLE_VERSION = 2
+HEADER = struct.Struct("<4sHHII")   # magic, version, padding, row count, size of the names blob
+INT_COLUMNS = [("ids", "I"), ("release", "I"), ("price", "i"), ("positive", "I"), ("negative", "I")]
+# Computed from the columns above when a table is built and stored since version 2, so
+# nothing has to redo the arithmetic per row: the review score as a fixed-point int
+# (positive / total * SCORE_SCALE, rounded) and the total number of reviews
+DERIVED_COLUMNS = [("score", "I"), ("total", "I")]
+SCORE_SCALE = 1000000
+
+def review_score(positive, negative):
+    total = positive + negative
+    return (2 * positive * SCORE_SCALE + total) // (2 * total) if total else 0
+
+def derive_columns(positive, negative):
+    score = array('I', map(review_score, positive, negative))
+    total = array('I', map(int.__add__, positive, negative))
+    return score, total
+
+# Display strings for the stored encodings: price in cents, release as YYYYMMDD, score as above
+def format_price(cents):
+    sign = "-" if cents < 0 else ""
+    return f"R$ {sign}{abs(cents) // 100},{abs(cents) % 100:02d}"
+
+def format_date(release):
+    if not 10000000 <= release <= 99999999:
+        return ""
+    return f"{release // 10000}/{release // 100 % 100:02d}/{release % 100:02d}"
+
+def format_score(score, total):
+    if not total:
+        return "-"
+    tenths = (score * 1000 + SCORE_SCALE // 2) // SCORE_SCALE
+    return f"{tenths // 10}.{tenths % 10}%"
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+# Columnar store for the games data: one typed array per field, rows sorted by app_id,
+# and all names in a single utf-8 blob sliced by name_offsets. get() returns the
+# [name, release, price, positive, negative] rows the TUI used from games.bin followed by
+# the derived score and total.
+class GameTable:
+    def __init__(self, ids, release, price, positive, negative, name_offsets, names, score=None, total=None):
+        self.ids = ids
+        self.release = release
+        self.price = price
+        self.positive = positive
+        self.negative = negative
+        self.name_offsets = name_offsets   # len(ids) + 1 entries, name i is names[off[i]:off[i+1]]
+        self.names = names
+        if score is None or total is None:
+            score, total = derive_columns(positive, negative)
+        self.score = score
+        self.total = total
+        self._mm = None
+        self._file = None
+
+    @staticmethod
+    def from_dict(games):
+        # games.bin format: {"app_id": [name, release, price, positive, negative]}
+        ids = array('I', sorted(int(app_id) for app_id in games))
+        release, price, positive, negative = array('I'), array('i'), array('I'), array('I')
+        name_offsets = array('I', [0])
+        names = bytearray()
+        for app_id in ids:
+            # a repeated app_id in games.csv leaves BinaryDict.py's list with the fields of
+            # every row, one after the other; the first row wins, as in Ingest.py
+            name, rel, pri, pos, neg = games[str(app_id)][:5]
+            release.append(rel)
+            price.append(pri)
+            positive.append(pos)
+            negative.append(neg)
+            names += str(name).encode('utf-8')
+            name_offsets.append(len(names))
+        return GameTable(ids, release, price, positive, negative, name_offsets, bytes(names))
+
+    # Returns a new table with the rows in upserts ({app_id: [name, release, price, positive,
+    # negative]}) added or replaced and the app_ids in removed dropped. Untouched rows are
+    # copied column by column, so a small delta costs one pass over the arrays, not a rebuild
+    # of games.bin.
+    def with_changes(self, upserts, removed=()):
+        upserts = {int(app_id): row for app_id, row in upserts.items()}
+        removed = set(int(app_id) for app_id in removed)
+        dropped = removed | set(upserts)
+        ids, release, price, positive, negative = array('I'), array('I'), array('i'), array('I'), array('I')
+        name_offsets = array('I', [0])
+        names = bytearray()
+
+        def append(app_id, name_bytes, rel, pri, pos, neg):
+            ids.append(app_id)
+            release.append(rel)
+            price.append(pri)
+            positive.append(pos)
+            negative.append(neg)
+            names.extend(name_bytes)
+            name_offsets.append(len(names))
+
+        new_ids = sorted(app_id for app_id in upserts if app_id not in removed)
+        j = 0
+        for i, app_id in enumerate(self.ids):
+            while j < len(new_ids) and new_ids[j] < app_id:
+                name, rel, pri, pos, neg = upserts[new_ids[j]][:5]
+                append(new_ids[j], str(name).encode('utf-8'), rel, pri, pos, neg)
+                j += 1
+            if app_id in dropped:
+                continue
+            append(app_id, self.names[self.name_offsets[i]:self.name_offsets[i + 1]],
+                   self.release[i], self.price[i], self.positive[i], self.negative[i])
+        for app_id in new_ids[j:]:
+            name, rel, pri, pos, neg = upserts[app_id][:5]
+            append(app_id, str(name).encode('utf-8'), rel, pri, pos, neg)
+        return GameTable(ids, release, price, positive, negative, name_offsets, bytes(names))
+
+    def index_of(self, app_id):
+        try:
+            app_id = int(app_id)
+        except (TypeError, ValueError):
+            return -1
+        i = bisect_left(self.ids, app_id)
+        if i < len(self.ids) and self.ids[i] == app_id:
+            return i
+        return -1
+
+    def name(self, i):
+        return bytes(self.names[self.name_offsets[i]:self.name_offsets[i + 1]]).decode('utf-8')
+
+    def row(self, i):
+        return [self.name(i), self.release[i], self.price[i], self.positive[i], self.negative[i],
+                self.score[i], self.total[i]]
+
+    def get(self, app_id, default=None):
+        i = self.index_of(app_id)
+        return self.row(i) if i >= 0 else default
+
+    def __contains__(self, app_id):
+        return self.index_of(app_id) >= 0
+
+    def __len__(self):
+        return len(self.ids)
+
+    def keys(self):
+        return (str(app_id) for app_id in self.ids)
+
+    # Writes to a temporary file and renames it over file_path, so a table that is currently
+    # mapped by load() is never rewritten in place
+    def save(self, file_path):
+        count = len(self.ids)
+        tmp_path = file_path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(TABLE_MAGIC, TABLE_VERSION, 0, count, len(self.names)))
+            for attr, _ in INT_COLUMNS + DERIVED_COLUMNS + [("name_offsets", "I")]:
+                f.write(b"\0" * (_align(f.tell()) - f.tell()))
+                f.write(bytes(memoryview(getattr(self, attr))))
+            f.write(b"\0" * (_align(f.tell()) - f.tell()))
+            f.write(bytes(self.names))
+        os.replace(tmp_path, file_path)
+
+    @staticmethod
+    def load(file_path):
+        f = open(file_path, 'rb')
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, count, names_size = HEADER.unpack_from(mm, 0)
+        # version 1 tables have no derived columns; they are computed again after loading
+        if magic != TABLE_MAGIC or version not in (1, TABLE_VERSION):
+            mm.close()
+            f.close()
+            raise ValueError(f"{file_path} is not a version {TABLE_VERSION} game table")
+
+        view = memoryview(mm)
+        columns = {}
+        offset = HEADER.size
+        stored = INT_COLUMNS + (DERIVED_COLUMNS if version >= 2 else [])
+        for attr, typecode in stored + [("name_offsets", "I")]:
+            offset = _align(offset)
+            size = (count + 1 if attr == "name_offsets" else count) * 4
+            columns[attr] = view[offset:offset + size].cast(typecode)
+            offset += size
+        offset = _align(offset)
+        names = view[offset:offset + names_size]
+
+        table = GameTable(columns["ids"], columns["release"], columns["price"], columns["positive"],
+                          columns["negative"], columns["name_offsets"], names,
+                          columns.get("score"), columns.get("total"))
+        table._mm = mm
+        table._file = f
+        return table
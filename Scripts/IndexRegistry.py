@@ -0,0 +1,144 @@
+import threading
+import time
+
+# Raised by IndexRegistry.get() when an index could not be read or built; the original
+# exception is kept in error (and as __cause__)
+class IndexLoadError(Exception):
+    def __init__(self, name, error):
+        super().__init__(f"could not load index '{name}': {error}")
+        self.name = name
+        self.error = error
+
+# Loads each index the first time something asks for it instead of all of them at startup.
+# A background thread can warm the remaining ones while the user is still typing; whoever
+# asks for an index that is half loaded just waits for that load, it never runs twice.
+class IndexRegistry:
+    def __init__(self):
+        self._loaders = {}
+        self._values = {}
+        self._errors = {}
+        self._locks = {}
+        self.timings = {}   # name -> seconds the load took
+        self._warmer = None
+
+    def register(self, name, loader):
+        self._loaders[name] = loader
+        self._locks[name] = threading.Lock()
+
+    def get(self, name):
+        try:
+            return self._values[name]
+        except KeyError:
+            pass
+        with self._locks[name]:
+            if name in self._errors:
+                raise self._errors[name]
+            if name not in self._values:
+                start = time.perf_counter()
+                try:
+                    self._values[name] = self._loaders[name]()
+                except IndexLoadError as e:  # an index this one is built from failed
+                    self._errors[name] = e
+                    raise
+                except Exception as e:
+                    self._errors[name] = IndexLoadError(name, e)
+                    raise self._errors[name] from e
+                self.timings[name] = time.perf_counter() - start
+        return self._values[name]
+
+    __getitem__ = get
+
+    def __contains__(self, name):
+        return name in self._loaders
+
+    def loaded(self, name):
+        return name in self._values
+
+    # Forgets names (loaded or failed) so the next get() reads them from disk again, e.g.
+    # after ApplyDelta.py replaced their files. Whoever still holds the old object keeps it.
+    def reset(self, names):
+        for name in names:
+            with self._locks[name]:
+                self._values.pop(name, None)
+                self._errors.pop(name, None)
+                self.timings.pop(name, None)
+
+    # Loads names (all registered ones by default) in order on a daemon thread. Errors are
+    # kept and raised again when the index is actually used.
+    def warm(self, names=None):
+        names = list(self._loaders) if names is None else list(names)
+
+        def run():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception:
+                    pass
+
+        self._warmer = threading.Thread(target=run, name="index-warmup", daemon=True)
+        self._warmer.start()
+        return self._warmer
+
+    # A dict-like view, e.g. the trees dict the TUI and the query planner take
+    def view(self, names):
+        return LazyMapping(self, names)
+
+    # Stands in for a single index (the game table, the ranks, the substring index) so code
+    # that expects the object itself triggers the load on first use
+    def proxy(self, name):
+        return LazyIndex(self, name)
+
+    def report(self):
+        parts = [f"{name} {self.timings[name] * 1000:.0f} ms" for name in self._loaders if name in self.timings]
+        pending = [name for name in self._loaders if name not in self._values and name not in self._errors]
+        if pending and self._warmer is not None and self._warmer.is_alive():
+            parts.append("loading " + ", ".join(pending))
+        return " · ".join(parts)
+
+
+class LazyMapping:
+    def __init__(self, registry, names):
+        self._registry = registry
+        self._names = dict(names)   # key in the view -> name in the registry
+
+    def __getitem__(self, key):
+        return self._registry.get(self._names[key])
+
+    def get(self, key, default=None):
+        return self[key] if key in self._names else default
+
+    def __contains__(self, key):
+        return key in self._names
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
+    def keys(self):
+        return self._names.keys()
+
+
+class LazyIndex:
+    __slots__ = ('_registry', '_name')
+
+    def __init__(self, registry, name):
+        self._registry = registry
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(self._registry.get(self._name), attr)
+
+    # special methods are looked up on the type, so they have to be forwarded one by one
+    def __contains__(self, item):
+        return item in self._registry.get(self._name)
+
+    def __len__(self):
+        return len(self._registry.get(self._name))
+
+    def __iter__(self):
+        return iter(self._registry.get(self._name))
+
+    def __getitem__(self, key):
+        return self._registry.get(self._name)[key]
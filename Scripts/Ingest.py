@@ -0,0 +1,192 @@
+import argparse
+import csv
+import itertools
+import os
+import resource
+import sys
+import time
+from array import array
+from BPlusTree import BPlusTree, BPlusNode
+from Bitmap import Bitmap
+from DataFiles import parse_int, save_tree
+from GameTable import GameTable
+from PatriciaTree import SuffixTree
+from SuffixArray import SuffixArray
+
+
+# Monta todas as estruturas de Data/ lendo cada csv uma vez só, no lugar de rodar
+# BinaryDict.py, CsvToBin.py (tags e categorias), ordering.py e o build_from_csv do índice
+# de substrings, que cada um relia os dados e guardava um dicionário inteiro na memória.
+#
+# games.csv é lido em blocos e cada linha vai direto para colunas tipadas (array), que já
+# são o formato da games.tbl; tags.csv e categories.csv viram um array de app_ids por chave.
+# Só depois da leitura as estruturas são montadas: as árvores de nome/preço/data/review
+# saem de uma ordenação de cada coluna inteira, as de tags/categorias dos arrays, e o
+# names.sa (e o patricia.bin) dos nomes da tabela já pronta, sem reler o csv.
+# A memória não é limitada: ela cresce com o catálogo, já que as colunas ficam todas
+# carregadas e cada .bin é o pickle de uma árvore inteira em memória. O que se economiza
+# em relação aos scripts antigos são os dicionários e listas por linha (a linha custa
+# uns 20 bytes mais o nome, em vez de uma lista de objetos).
+# O .bpt de cada árvore é refeito se já existia (ou sempre, com --paged).
+#
+#   python Ingest.py [--chunk 50000] [--paged] [--patricia] [--processes N]
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'Data')
+SCALAR_DEGREE = 200     # mesmo grau das árvores geradas pelo ordering.py
+POSTINGS_DEGREE = 7     # e das de tags/categorias do CsvToBin.py
+
+
+def read_chunks(path, chunk_size):
+    # linhas do csv em listas de até chunk_size, pra nunca ter o arquivo inteiro na memória
+    with open(path, "r", newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        while chunk := list(itertools.islice(reader, chunk_size)):
+            yield chunk
+
+
+class Progress:
+    def __init__(self, label):
+        self.label = label
+        self.rows = 0
+        self.started = time.perf_counter()
+
+    def advance(self, rows):
+        self.rows += rows
+        elapsed = time.perf_counter() - self.started
+        print(f"\r{self.label}: {self.rows} linhas ({self.rows / max(elapsed, 1e-9):,.0f}/s)", end="", flush=True)
+
+    def done(self):
+        print(f"\r{self.label}: {self.rows} linhas em {time.perf_counter() - self.started:.1f}s")
+
+
+class GamesBuilder:
+    # colunas da games.tbl preenchidas linha a linha, na ordem do csv
+    def __init__(self):
+        self.ids = array('I')
+        self.release = array('I')
+        self.price = array('i')
+        self.positive = array('I')
+        self.negative = array('I')
+        self.name_offsets = array('I', [0])
+        self.names = bytearray()
+
+    def feed(self, rows):
+        for row in rows:
+            self.ids.append(int(row["app_id"]))
+            # mesmos padrões do BinaryDict.py para campos vazios ou inválidos
+            self.release.append(parse_int(row["release_date"], 100000000))
+            self.price.append(parse_int(row["price_overview"], 0))
+            self.positive.append(parse_int(row["positive"], 0))
+            self.negative.append(parse_int(row["negative"], 0))
+            self.names += row["name"].encode('utf-8')
+            self.name_offsets.append(len(self.names))
+
+    def table(self):
+        # a tabela é ordenada por app_id; se um app_id se repete vale a primeira linha,
+        # como no BinaryDict.py (que estende a lista do app_id e só usa os 5 primeiros campos)
+        first = {}
+        for i, app_id in enumerate(self.ids):
+            first.setdefault(app_id, i)
+        order = sorted(first.values(), key=self.ids.__getitem__)
+        name_offsets = array('I', [0])
+        names = bytearray()
+        for i in order:
+            names += self.names[self.name_offsets[i]:self.name_offsets[i + 1]]
+            name_offsets.append(len(names))
+        columns = [array(column.typecode, (column[i] for i in order))
+                   for column in (self.ids, self.release, self.price, self.positive, self.negative)]
+        return GameTable(*columns, name_offsets, bytes(names))
+
+
+class PostingsBuilder:
+    # chave (tag ou categoria) -> array de app_ids
+    def __init__(self, column):
+        self.column = column
+        self.postings = {}
+
+    def feed(self, rows):
+        for row in rows:
+            self.postings.setdefault(row[self.column], array('I')).append(int(row["app_id"]))
+
+    def tree(self):
+        return BPlusTree.bulk_load(((key, Bitmap.from_iterable(self.postings[key])) for key in sorted(self.postings)),
+                                   POSTINGS_DEGREE)
+
+
+def scalar_trees(table):
+    # árvores com uma entrada (chave, app_id) por jogo, montadas a partir das colunas
+    # (a de review usa o score em ponto fixo que a tabela já calculou)
+    keys = {
+        "nametree": table.name,
+        "pricetree": table.price.__getitem__,
+        "releasetree": table.release.__getitem__,
+        "reviewtree": table.score.__getitem__,
+    }
+    for name, key_of in keys.items():
+        column = [key_of(i) for i in range(len(table))]
+        order = sorted(range(len(table)), key=column.__getitem__) # estável: empates ficam por app_id
+        yield name, BPlusTree.bulk_load(((column[i], table.ids[i]) for i in order), SCALAR_DEGREE)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Monta todas as estruturas de Data/ a partir dos csvs")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--chunk", type=int, default=50000, help="linhas de csv lidas por vez")
+    parser.add_argument("--paged", action="store_true", help="grava também os .bpt")
+    parser.add_argument("--patricia", action="store_true", help="monta também o patricia.bin")
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+    args = parser.parse_args(argv)
+    data_dir = args.data_dir
+    started = time.perf_counter()
+
+    games = GamesBuilder()
+    progress = Progress("games.csv")
+    for chunk in read_chunks(os.path.join(data_dir, "games.csv"), args.chunk):
+        games.feed(chunk)
+        progress.advance(len(chunk))
+    progress.done()
+
+    postings = {}
+    for name, column in (("tags", "tag"), ("categories", "category")):
+        path = os.path.join(data_dir, name + ".csv")
+        if not os.path.exists(path):
+            print(f"{name}.csv não encontrado, pulando")
+            continue
+        postings[name] = PostingsBuilder(column)
+        progress = Progress(name + ".csv")
+        for chunk in read_chunks(path, args.chunk):
+            postings[name].feed(chunk)
+            progress.advance(len(chunk))
+        progress.done()
+
+    def write_tree(name, tree):
+        save_tree(name, tree, data_dir, args.paged)
+        print(f"{name} gravada")
+
+    table = games.table()
+    del games
+    table.save(os.path.join(data_dir, "games.tbl"))
+    print("games.tbl gravada")
+    for name, tree in scalar_trees(table):
+        write_tree(name, tree)
+    for name, builder in postings.items():
+        write_tree(name, builder.tree())
+
+    names = ((app_id, table.name(i)) for i, app_id in enumerate(table.ids))
+    SuffixArray.build(names, processes=args.processes).save_tree(os.path.join(data_dir, "names.sa"))
+    print("names.sa gravado")
+    if args.patricia:
+        index = SuffixTree()
+        for i, app_id in enumerate(table.ids):
+            name = table.name(i)
+            if name and name != '\\N':
+                index.add_name(app_id, name)
+        index.save_tree(os.path.join(data_dir, "patricia.bin"))
+        print("patricia.bin gravado")
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024
+    print(f"pronto em {time.perf_counter() - started:.1f}s, pico de memória {peak} MiB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
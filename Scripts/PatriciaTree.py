@@ -1,22 +1,132 @@
 import csv
 import os
 import pickle
+import threading
+from array import array
+from collections import Counter, OrderedDict
+from itertools import islice
+from multiprocessing import get_context
 
+# Prefix queries whose subtree holds at least this many distinct app_ids keep their
+# result cached, so repeated short queries ("a", "th") skip the subtree walk
+CACHE_MIN_RESULTS = 1000
+# The cached results hold at most this many app_ids in total (4 bytes each); the least
+# recently used ones are dropped first
+CACHE_MAX_IDS = 2000000
+
+# The suffix tree creates millions of these, so they are kept as small as possible:
+# no instance __dict__, no children dict until the first child shows up, and a node
+# holding a single app_id stores the int itself instead of a one-element list.
+# count is the number of values in the subtree, an upper bound on its distinct app_ids
+# (one name puts its app_id under several suffixes) that the query planner can read
+# without walking anything.
 class Node:
+    __slots__ = ('key', 'children', 'values', 'count')
+
     def __init__(self, key='', value=None):
         self.key = key
-        self.children = {}
-        self.values = []
-        if value is not None:
+        self.children = None  # dict of first character -> Node, created on demand
+        self.values = value   # None, a single app_id, or a list of app_ids
+        self.count = 0 if value is None else 1
+
+    def add_child(self, child):
+        if self.children is None:
+            self.children = {}
+        self.children[child.key[0]] = child
+
+    # Both return whether the node's values changed, so the counts above can follow
+    def add_value(self, value):
+        if self.values is None:
+            self.values = value
+        elif isinstance(self.values, list):
+            if value in self.values:
+                return False
             self.values.append(value)
+        elif self.values != value:
+            self.values = [self.values, value]
+        else:
+            return False
+        return True
+
+    def remove_value(self, value):
+        if isinstance(self.values, list):
+            if value not in self.values:
+                return False
+            self.values.remove(value)
+            if len(self.values) == 1:
+                self.values = self.values[0]
+            elif not self.values:
+                self.values = None
+        elif self.values == value:
+            self.values = None
+        else:
+            return False
+        return True
+
+    def iter_values(self):
+        if self.values is None:
+            return ()
+        if isinstance(self.values, list):
+            return self.values
+        return (self.values,)
 
 class PatriciaTree:
     def __init__(self):
         self.root = Node()
+        self._cache = OrderedDict()  # Node -> array('I') of the distinct app_ids below it, LRU order
+        self._cached_ids = 0
+        self._cache_lock = threading.Lock()
+
+    # The cache is rebuilt on demand, no need to write it to disk
+    def __getstate__(self):
+        return {'root': self.root}
+
+    def __setstate__(self, state):
+        self.root = state['root']
+        self._cache = OrderedDict()
+        self._cached_ids = 0
+        self._cache_lock = threading.Lock()
+        if not hasattr(self.root, 'count'):
+            self.recount() # saved before nodes kept counts
+
+    # Recomputes every node's count from the values below it (post-order, no recursion)
+    def recount(self):
+        stack = [(self.root, False)]
+        while stack:
+            node, children_done = stack.pop()
+            if children_done or not node.children:
+                values = node.values
+                node.count = (0 if values is None else len(values) if isinstance(values, list) else 1) + (
+                    sum(child.count for child in node.children.values()) if node.children else 0)
+            else:
+                stack.append((node, True))
+                stack.extend((child, False) for child in node.children.values())
+
+    def _cache_get(self, node):
+        with self._cache_lock:
+            cached = self._cache.get(node)
+            if cached is not None:
+                self._cache.move_to_end(node)
+            return cached
+
+    def _cache_put(self, node, results):
+        with self._cache_lock:
+            if node in self._cache:
+                return
+            self._cache[node] = results
+            self._cached_ids += len(results)
+            while self._cached_ids > CACHE_MAX_IDS:
+                _, dropped = self._cache.popitem(last=False)
+                self._cached_ids -= len(dropped)
+
+    def _cache_clear(self):
+        with self._cache_lock:
+            self._cache.clear()
+            self._cached_ids = 0
 
     # Returns the child that shares a prefix with the key
     def _find_matching_child(self, node, key):
-        if not key:
+        if not key or node.children is None:
             return None
         child = node.children.get(key[0])
         if not child:
@@ -33,13 +143,17 @@ class PatriciaTree:
     # Inserts a key-value pair into the tree, the value
     # being the app_id associated with the game name.
     def insert(self, key, value):
+        if self._cache:
+            self._cache_clear()
         node = self.root
+        path = [node]  # nodes whose count grows if the value is added
         while True:
             match = self._find_matching_child(node, key)
             if not match:
                 # No child shares a prefix, add a new leaf node
-                new_node = Node(key, value)
-                node.children[key[0]] = new_node
+                node.add_child(Node(key, value))
+                for above in path:
+                    above.count += 1
                 return
 
             child, common_prefix_len = match
@@ -51,9 +165,11 @@ class PatriciaTree:
                 # If the key is fully consumed, it means we've reached an existing node.
                 # Add the value to this node's list of values.
                 if not key:
-                    if value not in child.values:
-                        child.values.append(value)
+                    if child.add_value(value):
+                        for above in path + [child]:
+                            above.count += 1
                     return
+                path.append(child)
                 continue  # Continue insertion with the rest of the key
 
             # We need to split the child node
@@ -63,43 +179,76 @@ class PatriciaTree:
 
             # Create the new internal node for the common part
             internal_node = Node(common_prefix)
-            node.children[common_prefix[0]] = internal_node
+            internal_node.count = child.count + 1  # the old subtree plus the new value
+            node.add_child(internal_node)
 
             # Update the old child to be a child of the new internal node
             child.key = child_remainder
-            internal_node.children[child_remainder[0]] = child
+            internal_node.add_child(child)
 
             # If the new key has a remaining part, create a new leaf for it
             if new_key_remainder:
-                new_leaf = Node(new_key_remainder, value)
-                internal_node.children[new_key_remainder[0]] = new_leaf
+                internal_node.add_child(Node(new_key_remainder, value))
             else:
                 # The new key is a prefix of the existing key, so the internal node gets the value
-                if value not in internal_node.values:
-                    internal_node.values.append(value)
+                internal_node.add_value(value)
+            for above in path:
+                above.count += 1
             return
 
-    # Recursively traverse nodes to collect all stored values
-    def _collect_all_values(self, node, results):
-        if node.values:
-            results.extend(node.values)
-        for child in node.children.values():
-            self._collect_all_values(child, results)
+    # Removes value from the node holding exactly key. Nodes left empty stay in place,
+    # they just stop contributing to searches.
+    def remove(self, key, value):
+        node = self._find_prefix_node(key)
+        if node is None:
+            return
+        # _find_prefix_node may stop in the middle of an edge; the value only lives on a node
+        # whose full path spells key, which is the case when the walk ends on a node boundary
+        path, length = self._path(key, node)
+        if length == len(key) and node.remove_value(value):
+            for above in path:
+                above.count -= 1
+            if self._cache:
+                self._cache_clear()
 
-    # Finds all values for keys starting with a given prefix.
-    def find_all_prefixed(self, prefix):
+    # Nodes from the root down to target along key, and the length of key they spell
+    def _path(self, key, target):
+        node, length = self.root, 0
+        path = [node]
+        while node is not target:
+            node = node.children[key[length]]
+            length += len(node.key)
+            path.append(node)
+        return path, length
+
+    # Walks the subtree with an explicit stack (no recursion limit on long chains)
+    # and yields every app_id once, so callers can stop as soon as they have enough
+    def _iter_values(self, node):
+        seen = set()
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            for value in current.iter_values():
+                if value not in seen:
+                    seen.add(value)
+                    yield value
+            if current.children:
+                stack.extend(current.children.values())
+
+    # Returns the node whose subtree holds every key starting with prefix, or None
+    def _find_prefix_node(self, prefix):
         node = self.root
         key = prefix
         while key:
             match = self._find_matching_child(node, key)
             if not match:
-                return []
+                return None
             
             child, common_prefix_len = match
 
             # If prefix diverges from child's key, no match
             if common_prefix_len < len(key) and common_prefix_len < len(child.key):
-                return []
+                return None
 
             if common_prefix_len == len(child.key):
                 key = key[common_prefix_len:]
@@ -110,11 +259,41 @@ class PatriciaTree:
                 break
         
         if key:  # Prefix not found
+            return None
+        return node
+
+    # Finds all unique values for keys starting with a given prefix, at most limit of them.
+    def find_all_prefixed(self, prefix, limit=None):
+        node = self._find_prefix_node(prefix)
+        if node is None:
             return []
 
-        results = []
-        self._collect_all_values(node, results)
-        return list(set(results))  # Return unique values
+        cached = self._cache_get(node)
+        if cached is not None:
+            return list(cached if limit is None else cached[:limit])
+
+        if limit is not None:
+            return list(islice(self._iter_values(node), limit))
+
+        results = list(self._iter_values(node))
+        if len(results) >= CACHE_MIN_RESULTS:
+            self._cache_put(node, array('I', results))
+        return results
+
+    # Number of distinct values under prefix
+    def count_prefixed(self, prefix):
+        node = self._find_prefix_node(prefix)
+        if node is None:
+            return 0
+        cached = self._cache_get(node)
+        if cached is not None:
+            return len(cached)
+        return len(self.find_all_prefixed(prefix))
+
+    # Upper bound on count_prefixed read from the node's count, without walking the subtree
+    def count_values(self, prefix):
+        node = self._find_prefix_node(prefix)
+        return 0 if node is None else node.count
 
 # Here I am using the Patricia Tree to ease substring search (something like .*<search_term>.* in regEx)
 class SuffixTree:
@@ -124,10 +303,29 @@ class SuffixTree:
     def insert(self, word_part, app_id):
         self.patricia_tree.insert(word_part, app_id)
 
-    # Searches for all app_ids associated with game names containing the given substring.
+    # Indexes every suffix of a game name (lowercased) under its app_id
+    def add_name(self, app_id, game_name):
+        game_name = game_name.lower()
+        for i in range(len(game_name)):
+            self.insert(game_name[i:], app_id)
+
+    def remove_name(self, app_id, game_name):
+        game_name = game_name.lower()
+        for i in range(len(game_name)):
+            self.patricia_tree.remove(game_name[i:], app_id)
+
+    # Searches for all app_ids (ints) associated with game names containing the given substring.
     # Returns a list of unique app_ids.
-    def search_substring(self, substring):
-        return self.patricia_tree.find_all_prefixed(substring)
+    def search_substring(self, substring, limit=None):
+        return self.patricia_tree.find_all_prefixed(substring, limit)
+
+    def count_substring(self, substring):
+        return self.patricia_tree.count_prefixed(substring)
+
+    # Number of suffixes starting with substring: an upper bound on the matching names,
+    # read from the node counts like SuffixArray.count_hits reads its block width
+    def count_hits(self, substring):
+        return self.patricia_tree.count_values(substring)
 
     def save_tree(self, file_path):
         with open(file_path, 'wb') as f:
@@ -139,21 +337,62 @@ class SuffixTree:
             return pickle.load(f)
     
     @staticmethod # O mesmo aqui
-    def build_from_csv(csv_file_path):
-        game_suffix_tree = SuffixTree()
-        count = 0
+    def build_from_csv(csv_file_path, processes=None):
+        games = []
         with open(csv_file_path, 'r', encoding='utf-8') as f:
             reader = csv.reader(f)
             next(reader)  # Skip header
             for row in reader:
                 if len(row) > 1:
-                    app_id = row[0]
+                    app_id = int(row[0])
                     game_name = row[1]
                     if game_name and game_name != '\\N':
-                        # Insert all suffixes of the game name, associated with its app_id
-                        for i in range(len(game_name)):
-                            suffix = game_name[i:].lower() # Convert to lowercase for case-insensitive search
-                            game_suffix_tree.insert(suffix, app_id)
-                        count += 1
-        # print(f"Built Suffix Tree with {count} game names.")
+                        games.append((app_id, game_name.lower())) # Lowercase for case-insensitive search
+
+        if processes is not None and processes > 1:
+            return SuffixTree._build_parallel(games, processes)
+
+        game_suffix_tree = SuffixTree()
+        for app_id, game_name in games:
+            # Insert all suffixes of the game name, associated with its app_id
+            game_suffix_tree.add_name(app_id, game_name)
+        # print(f"Built Suffix Tree with {len(games)} game names.")
         return game_suffix_tree
+
+    # Every suffix hangs under the root child for its first character, so splitting the
+    # suffixes by first character gives subtrees that never overlap. Each worker builds
+    # the subtrees for its characters and the merge is just joining the root children.
+    @staticmethod
+    def _build_parallel(games, processes):
+        counts = Counter(ch for _, game_name in games for ch in game_name)
+        shards = [[] for _ in range(processes * 4)]
+        loads = [0] * len(shards)
+        for ch, count in counts.most_common():  # biggest first, always onto the lightest shard
+            lightest = loads.index(min(loads))
+            shards[lightest].append(ch)
+            loads[lightest] += count
+
+        game_suffix_tree = SuffixTree()
+        root = game_suffix_tree.patricia_tree.root
+        root.children = {}
+        # spawned, not forked, for the same reason as in SuffixArray.build
+        with get_context('spawn').Pool(processes, initializer=_init_shard_worker, initargs=(games,)) as pool:
+            for children in pool.imap_unordered(_build_shard, [s for s in shards if s]):
+                root.children.update(children)
+        root.count = sum(child.count for child in root.children.values())
+        return game_suffix_tree
+
+_shard_games = None
+
+def _init_shard_worker(games):
+    global _shard_games
+    _shard_games = games
+
+def _build_shard(chars):
+    chars = set(chars)
+    tree = PatriciaTree()
+    for app_id, game_name in _shard_games:
+        for i in range(len(game_name)):
+            if game_name[i] in chars:
+                tree.insert(game_name[i:], app_id)
+    return tree.root.children or {}
@@ -0,0 +1,22 @@
+import os
+import pickle
+from BPlusTree import BPlusTree, BPlusNode
+from Bitmap import Bitmap
+
+
+# Troca as listas de app_ids das árvores de categorias/tags já existentes por bitmaps
+# comprimidos, sem precisar dos csvs. Depois rode o BinToPaged.py se usar os .bpt.
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'Data')
+
+for name in ["categories", "tags"]:
+    bin_path = os.path.join(DATA_DIR, name + ".bin")
+    if not os.path.exists(bin_path):
+        print(f"{name}.bin não encontrado, pulando")
+        continue
+    with open(bin_path, "rb") as f:
+        tree = pickle.load(f)
+    pares = [(key, value if isinstance(value, Bitmap) else Bitmap.from_iterable(value)) for key, value in tree.iter_from()]
+    tree = BPlusTree.bulk_load(pares, tree.t)
+    with open(bin_path, "wb") as f:
+        pickle.dump(tree, f)
+    print(f"{name}.bin convertido")
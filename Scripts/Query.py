@@ -0,0 +1,298 @@
+import re
+from Bitmap import as_bitmap
+from GameTable import SCORE_SCALE
+
+# Small boolean query language over every index, e.g.
+#   name:"war" AND tag:Strategy AND price<2000 AND score>0.8 ORDER BY release DESC
+# Text fields use field:value (quote values with spaces), numeric fields use
+# <, <=, >, >=, = or != (price in cents, release as YYYYMMDD, score from 0 to 1).
+# AND binds tighter than OR; NOT and parentheses work as usual. ORDER BY takes one or more
+# comma-separated fields, each breaking the ties of the ones before it:
+#   tag:Indie AND score>0.9 ORDER BY price, score DESC
+
+TOKEN = re.compile(r'\s*(?:(\()|(\))|"((?:[^"\\]|\\.)*)"|(<=|>=|!=|<|>|=|:)|(,)|([^\s()<>=!:",]+))')
+KEYWORDS = {'AND', 'OR', 'NOT', 'ORDER', 'BY', 'ASC', 'DESC'}
+TEXT_FIELDS = {'name', 'tag', 'category'}
+NUMERIC_FIELDS = {'price', 'release', 'score', 'app_id'}
+# Games with an unknown release date are stored as 100000000; like the menu's date range,
+# an open-ended release comparison stops at the last real date
+LATEST_RELEASE = 99991231
+NUMERIC_TREES = {'price': 'price', 'release': 'release', 'score': 'review'}
+# ORDER BY field -> sort key used by the TUI
+SORT_KEYS = {'app_id': 'app_id', 'name': 'name', 'price': 'price', 'release': 'release_date', 'score': 'score',
+             'total': 'total'}
+OPERATORS = {
+    '<': lambda a, b: a < b,
+    '<=': lambda a, b: a <= b,
+    '>': lambda a, b: a > b,
+    '>=': lambda a, b: a >= b,
+    '=': lambda a, b: a == b,
+    '!=': lambda a, b: a != b,
+}
+
+def tokenize(text):
+    tokens = []
+    position = 0
+    text = text.strip()
+    while position < len(text):
+        match = TOKEN.match(text, position)
+        if not match or match.end() == position:
+            raise ValueError(f"unexpected character at {position}: {text[position:]!r}")
+        position = match.end()
+        opened, closed, quoted, operator, comma, word = match.groups()
+        if opened:
+            tokens.append(('(', opened))
+        elif closed:
+            tokens.append((')', closed))
+        elif quoted is not None:
+            tokens.append(('value', re.sub(r'\\(.)', r'\1', quoted)))
+        elif operator:
+            tokens.append(('op', operator))
+        elif comma:
+            tokens.append((',', comma))
+        elif word.upper() in KEYWORDS:
+            tokens.append((word.upper(), word))
+        else:
+            tokens.append(('value', word))
+    return tokens
+
+
+class Context:
+    # Everything the predicates need: the game table, the trees and the substring index
+    def __init__(self, games, trees, substring_index):
+        self.games = games
+        self.trees = trees
+        self.substring_index = substring_index
+        self._universe = None
+
+    @property
+    def universe(self):
+        if self._universe is None:
+            self._universe = set(self.games.ids)
+        return self._universe
+
+    def value(self, field, app_id):
+        i = self.games.index_of(app_id)
+        if i < 0:
+            return None
+        if field == 'price':
+            return self.games.price[i]
+        if field == 'release':
+            release = self.games.release[i]
+            return release if release <= LATEST_RELEASE else None
+        if field == 'score':
+            return self.games.score[i]
+        return app_id
+
+
+# Every node can estimate how many games it matches, fetch them as a set, or test a single
+# game. And runs only its most selective child as a fetch and tests the rest per game.
+class Text:
+    def __init__(self, field, value):
+        self.field = field
+        self.value = value
+        self._posting = None
+
+    def _tree_posting(self, ctx):
+        if self._posting is None:
+            tree = ctx.trees['tags' if self.field == 'tag' else 'categories']
+            self._posting = as_bitmap(tree.search(self.value)) or set()
+        return self._posting
+
+    def estimate(self, ctx):
+        if self.field == 'name':
+            return ctx.substring_index.count_hits(self.value.lower())
+        return len(self._tree_posting(ctx))
+
+    def fetch(self, ctx):
+        if self.field == 'name':
+            return set(ctx.substring_index.search_substring(self.value.lower()))
+        return set(self._tree_posting(ctx))
+
+    def matches(self, ctx, app_id):
+        if self.field == 'name':
+            i = ctx.games.index_of(app_id)
+            return i >= 0 and self.value.lower() in ctx.games.name(i).lower()
+        return app_id in self._tree_posting(ctx)
+
+
+class Compare:
+    def __init__(self, field, operator, number):
+        self.field = field
+        self.operator = operator
+        self.number = number
+        self.test = OPERATORS[operator]
+
+    def _bounds(self):
+        if self.operator in ('<', '<='):
+            lo, hi = None, self.number
+        elif self.operator in ('>', '>='):
+            lo, hi = self.number, None
+        elif self.operator == '=':
+            lo, hi = self.number, self.number
+        else:
+            lo, hi = None, None
+        if self.field == 'release' and hi is None:
+            hi = LATEST_RELEASE
+        return lo, hi
+
+    def estimate(self, ctx):
+        if self.field == 'app_id':
+            return 1 if self.operator == '=' else len(ctx.games)
+        lo, hi = self._bounds()
+        return int(ctx.trees[NUMERIC_TREES[self.field]].estimate_range(lo, hi) * len(ctx.games))
+
+    def fetch(self, ctx):
+        if self.field == 'app_id':
+            if self.operator == '=':
+                return {self.number} if ctx.games.index_of(self.number) >= 0 else set()
+            return {app_id for app_id in ctx.universe if self.test(app_id, self.number)}
+        lo, hi = self._bounds()
+        results = set()
+        for key, value in ctx.trees[NUMERIC_TREES[self.field]].range(lo, hi):
+            if self.test(key, self.number):
+                if isinstance(value, list):
+                    results.update(value)
+                else:
+                    results.add(value)
+        return results
+
+    def matches(self, ctx, app_id):
+        value = ctx.value(self.field, app_id)
+        return value is not None and self.test(value, self.number)
+
+
+class And:
+    def __init__(self, children):
+        self.children = children
+
+    def estimate(self, ctx):
+        return min(child.estimate(ctx) for child in self.children)
+
+    def fetch(self, ctx):
+        ranked = sorted(self.children, key=lambda child: child.estimate(ctx))
+        results = ranked[0].fetch(ctx)
+        for child in ranked[1:]:
+            if not results:
+                break
+            results = {app_id for app_id in results if child.matches(ctx, app_id)}
+        return results
+
+    def matches(self, ctx, app_id):
+        return all(child.matches(ctx, app_id) for child in self.children)
+
+
+class Or:
+    def __init__(self, children):
+        self.children = children
+
+    def estimate(self, ctx):
+        return min(len(ctx.games), sum(child.estimate(ctx) for child in self.children))
+
+    def fetch(self, ctx):
+        results = set()
+        for child in self.children:
+            results |= child.fetch(ctx)
+        return results
+
+    def matches(self, ctx, app_id):
+        return any(child.matches(ctx, app_id) for child in self.children)
+
+
+class Not:
+    def __init__(self, child):
+        self.child = child
+
+    def estimate(self, ctx):
+        return max(0, len(ctx.games) - self.child.estimate(ctx))
+
+    def fetch(self, ctx):
+        return ctx.universe - self.child.fetch(ctx)
+
+    def matches(self, ctx, app_id):
+        return not self.child.matches(ctx, app_id)
+
+
+class Parser:
+    def __init__(self, text):
+        self.tokens = tokenize(text)
+        self.position = 0
+
+    def peek(self):
+        return self.tokens[self.position][0] if self.position < len(self.tokens) else None
+
+    def take(self, kind):
+        if self.peek() != kind:
+            found = self.tokens[self.position][1] if self.position < len(self.tokens) else 'end of query'
+            raise ValueError(f"expected {kind}, found {found!r}")
+        token = self.tokens[self.position]
+        self.position += 1
+        return token[1]
+
+    def parse(self):
+        expression = self.expression()
+        order = None
+        if self.peek() == 'ORDER':
+            self.take('ORDER')
+            self.take('BY')
+            order = [self.sort_field()]
+            while self.peek() == ',':
+                self.take(',')
+                order.append(self.sort_field())
+            order = tuple(order)
+        if self.peek() is not None:
+            raise ValueError(f"unexpected {self.tokens[self.position][1]!r}")
+        return expression, order
+
+    def sort_field(self):
+        field = self.take('value').lower()
+        if field not in SORT_KEYS:
+            raise ValueError(f"can't order by {field!r}")
+        descending = False
+        if self.peek() in ('ASC', 'DESC'):
+            descending = self.take(self.peek()).upper() == 'DESC'
+        return SORT_KEYS[field], descending
+
+    def expression(self):
+        children = [self.term()]
+        while self.peek() == 'OR':
+            self.take('OR')
+            children.append(self.term())
+        return children[0] if len(children) == 1 else Or(children)
+
+    def term(self):
+        children = [self.factor()]
+        while self.peek() == 'AND':
+            self.take('AND')
+            children.append(self.factor())
+        return children[0] if len(children) == 1 else And(children)
+
+    def factor(self):
+        if self.peek() == 'NOT':
+            self.take('NOT')
+            return Not(self.factor())
+        if self.peek() == '(':
+            self.take('(')
+            expression = self.expression()
+            self.take(')')
+            return expression
+        field = self.take('value').lower()
+        operator = self.take('op')
+        value = self.take('value')
+        if operator == ':':
+            if field in NUMERIC_FIELDS:
+                raise ValueError(f"{field!r} needs a comparison, like {field}<100")
+            if field not in TEXT_FIELDS:
+                raise ValueError(f"unknown field {field!r}")
+            return Text(field, value)
+        if field not in NUMERIC_FIELDS:
+            raise ValueError(f"{field!r} can't be compared with {operator}")
+        # scores are typed from 0 to 1 but stored (and keyed in the review tree) as fixed point
+        return Compare(field, operator, round(float(value) * SCORE_SCALE) if field == 'score' else int(value))
+
+
+# Parses and runs a query. Returns (app_ids, order) where order is a tuple of one or more
+# (sort_key, descending) pairs, most significant first, or None.
+def run_query(text, ctx):
+    expression, order = Parser(text).parse()
+    return list(expression.fetch(ctx)), order
@@ -0,0 +1,127 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+from array import array
+
+# LRU cache for search results and sorted result lists, bounded by an estimate of the
+# memory the cached values take rather than by entry count, since one broad tag query
+# can hold more ids than a thousand name searches. Every entry is stamped with the
+# index generation it was computed under; once any index file on disk changes, the
+# stamp changes and old entries stop matching. Safe to share between threads (Server.py):
+# a thread missing a key another thread is computing waits for that result instead of
+# computing it again, while misses on other keys go ahead.
+class QueryCache:
+    def __init__(self, max_bytes, generation=None):
+        self.max_bytes = max_bytes
+        self._generation = generation or (lambda: None)
+        self._entries = OrderedDict()   # key -> (generation, value, size)
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._computing = {}   # key -> [lock held while computing it, threads using the lock]
+
+    def get(self, key, default=None):
+        return self._get(key, default, self._generation())
+
+    def _get(self, key, default, generation, count=True):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == generation:
+                self._entries.move_to_end(key)
+                self.hits += count
+                return entry[1]
+            if entry is not None:
+                self._drop(key)
+            self.misses += count
+            return default
+
+    def put(self, key, value):
+        return self._put(key, value, self._generation())
+
+    def _put(self, key, value, generation):
+        size = estimate_size(value)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            if size > self.max_bytes:
+                return value
+            self._entries[key] = (generation, value, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+        return value
+
+    # Cached value for key, computing and storing it with compute() on a miss. The entry is
+    # stamped with the generation read before computing, so a result computed from indexes
+    # that changed in the meantime is never stored as current.
+    def get_or_compute(self, key, compute):
+        missing = object()
+        generation = self._generation()
+        value = self._get(key, missing, generation)
+        if value is not missing:
+            return value
+        with self._lock:
+            computing = self._computing.setdefault(key, [threading.Lock(), 0])
+            computing[1] += 1
+        try:
+            with computing[0]:
+                # whoever held the lock before may have just stored it
+                value = self._get(key, missing, generation, count=False)
+                if value is missing:
+                    value = self._put(key, compute(), generation)
+        finally:
+            with self._lock:
+                computing[1] -= 1
+                if not computing[1]:
+                    del self._computing[key]
+        return value
+
+    def _drop(self, key):
+        self.bytes -= self._entries.pop(key)[2]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def report(self):
+        total = self.hits + self.misses
+        rate = f"{self.hits / total:.0%}" if total else "-"
+        return (f"{len(self._entries)} entries, {self.bytes // 1024} KiB, "
+                f"{self.hits} hits / {self.misses} misses ({rate})")
+
+
+# Generation stamp of a set of index files: their modification times, so rebuilding or
+# patching any of them (BinToPaged.py, ApplyDelta.py, Ingest.py) invalidates the cache
+def file_generation(paths):
+    def stamp():
+        stamps = []
+        for path in paths:
+            try:
+                stamps.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                stamps.append(None)
+        return tuple(stamps)
+    return stamp
+
+
+# Rough size in bytes of a cached result: the container plus its elements, sampling the
+# first element instead of walking millions of ids. Values may nest in tuples (results
+# and their ORDER BY) and lazy sorted rows report their own footprint.
+def estimate_size(value):
+    if hasattr(value, 'memory_size'):
+        return value.memory_size()
+    if isinstance(value, array):
+        return sys.getsizeof(value)
+    if isinstance(value, tuple):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    if isinstance(value, list):
+        return sys.getsizeof(value) + (len(value) * sys.getsizeof(value[0]) if value else 0)
+    return sys.getsizeof(value)
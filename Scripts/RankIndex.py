@@ -0,0 +1,136 @@
+import pickle
+from array import array
+from bisect import bisect_left
+
+# Position an app_id gets in an ordering it doesn't appear in, so it sorts last
+MISSING = 0xFFFFFFFF
+
+# Sort keys of the TUI and the tree each ordering is read from
+ORDERINGS = {
+    'name': 'name',
+    'price': 'price',
+    'release_date': 'release',
+    'score': 'review',
+}
+
+# Sort keys read straight from a game table column instead of a tree
+COLUMN_ORDERINGS = {
+    'total': 'total',
+}
+
+# Saved with every index; main.py rebuilds a ranks.bin written by another version
+RANKS_VERSION = 2
+
+# Precomputed position of every app_id in each tree ordering. Sorting a result set
+# then only touches the k ids in it (O(k log k)) instead of walking every leaf of a tree.
+# Positions are unique, ties in app_id order; for sorts on several keys values holds
+# the key itself, compacted to its position among the distinct keys.
+# Every sort here gives the same order for the same keys: descending is the exact reverse
+# of ascending (ties included) and games the index doesn't know come last in app_id order,
+# which is also what the TUI's lazy walk over orders does.
+class RankIndex:
+    def __init__(self, ids, ranks, orders, values=None):
+        self.ids = ids        # array('I') of every app_id, sorted
+        self.ranks = ranks    # sort key -> array('I') aligned with ids
+        self.orders = orders  # sort key -> array('I') of app_ids in that order (inverse of ranks)
+        self.values = values  # sort key -> array('I') aligned with ids, equal keys share a value
+        self.version = RANKS_VERSION
+
+    @staticmethod
+    def build(trees, games=None):
+        orders = {}
+        distinct = {}   # sort key -> number of distinct keys before each entry of its order
+        seen = set()
+
+        def add(sort_key, entries):
+            order, counts = [], []
+            previous, count, start = object(), -1, 0
+            for key, app_id in entries:
+                if key != previous:
+                    order[start:] = sorted(order[start:]) # ties of the previous key in app_id order
+                    previous, count, start = key, count + 1, len(order)
+                order.append(app_id)
+                counts.append(count)
+            order[start:] = sorted(order[start:])
+            orders[sort_key] = order
+            distinct[sort_key] = counts
+            seen.update(order)
+
+        def tree_entries(tree):
+            for key, value in tree.iter_from():
+                if isinstance(value, list):
+                    for app_id in value:
+                        yield key, app_id
+                else:
+                    yield key, value
+
+        for sort_key, tree_name in ORDERINGS.items():
+            add(sort_key, tree_entries(trees[tree_name]))
+        if games is not None:
+            # the table is sorted by app_id and sorted() is stable, so ties are already in app_id order
+            for sort_key, column_name in COLUMN_ORDERINGS.items():
+                column = getattr(games, column_name)
+                add(sort_key, ((column[i], games.ids[i]) for i in sorted(range(len(games)), key=column.__getitem__)))
+
+        ids = array('I', sorted(seen))
+        ranks, values = {}, {}
+        for sort_key, order in orders.items():
+            rank = array('I', [MISSING]) * len(ids)
+            value = array('I', [MISSING]) * len(ids)
+            for position, (app_id, count) in enumerate(zip(order, distinct[sort_key])):
+                i = bisect_left(ids, app_id)
+                rank[i] = position
+                value[i] = count
+            ranks[sort_key] = rank
+            values[sort_key] = value
+        orders = {sort_key: array('I', order) for sort_key, order in orders.items()}
+        return RankIndex(ids, ranks, orders, values)
+
+    def __contains__(self, sort_key):
+        return sort_key in self.ranks
+
+    # Returns app_ids (ints) in order of sort_key
+    def sort(self, app_ids, sort_key, descending=False):
+        rank = self.ranks[sort_key]
+        ids = self.ids
+        size = len(ids)
+        known, missing = [], []
+        for app_id in app_ids:
+            i = bisect_left(ids, app_id)
+            if i < size and ids[i] == app_id:
+                known.append((rank[i], app_id))
+            else:
+                missing.append(app_id)
+        known.sort(reverse=descending)
+        return [app_id for _, app_id in known] + sorted(missing)
+
+    # Returns app_ids (ints) ordered by several keys, e.g. [('price', False), ('score', True)]:
+    # one stable sort per key over the games' positions, last key first, so each pass only
+    # reorders what the keys before it left tied. Remaining ties are in app_id order, in the
+    # direction of the first key, and games the index doesn't know come last.
+    def sort_by(self, app_ids, keys):
+        ids = self.ids
+        size = len(ids)
+        positions, missing = [], []
+        for app_id in app_ids:
+            i = bisect_left(ids, app_id)
+            if i < size and ids[i] == app_id:
+                positions.append(i)
+            else:
+                missing.append(app_id)
+        positions.sort(reverse=keys[0][1]) # ids is sorted, so this is app_id order
+        for sort_key, descending in reversed(keys):
+            if sort_key == 'app_id':
+                positions.sort(reverse=descending)
+            else:
+                positions.sort(key=self.values[sort_key].__getitem__, reverse=descending)
+        return [ids[i] for i in positions] + sorted(missing)
+
+    def save(self, file_path):
+        with open(file_path, 'wb') as f:
+            pickle.dump(self, f)
+
+    @staticmethod
+    def load(file_path):
+        with open(file_path, 'rb') as f:
+            return pickle.load(f)
@@ -0,0 +1,165 @@
+import json
+import os
+import socket
+import threading
+from IndexRegistry import IndexLoadError
+
+# Thin client for Server.py. It has the same search/sort/stats calls as main.SearchService,
+# so the menu and the TUI run unchanged on top of it. Search results and sorted results
+# come back one page at a time as they are read (sorted pages along with the rows to
+# draw), so a broad search never sends the whole result set over the socket.
+DEFAULT_SERVER_ADDRESS = (os.path.join(os.path.dirname(__file__), '..', 'Data', 'search.sock')
+                          if hasattr(socket, 'AF_UNIX') else '127.0.0.1:8765')
+PAGE_SIZE = 256
+
+# "HOST:PORT" is a TCP address, anything else the path of a Unix socket
+def parse_address(address):
+    host, sep, port = address.rpartition(':')
+    if sep and port.isdigit() and os.sep not in address:
+        return socket.AF_INET, (host or '127.0.0.1', int(port))
+    return socket.AF_UNIX, address
+
+# Any other error the server reports; main.py shows it instead of crashing the TUI
+class ServerError(RuntimeError):
+    pass
+
+class SearchClient:
+    def __init__(self, address=DEFAULT_SERVER_ADDRESS):
+        family, target = parse_address(address)
+        self._sock = socket.socket(family, socket.SOCK_STREAM)
+        self._sock.connect(target)
+        self._file = self._sock.makefile('rwb')
+        self._lock = threading.Lock()
+        self.games = RemoteGames(self)
+
+    # One request per line, one response per line: {"op": ..., params} -> {"ok": ..., "result": ...}
+    def call(self, op, **params):
+        with self._lock:
+            self._file.write(json.dumps({'op': op, **params}).encode('utf-8') + b'\n')
+            self._file.flush()
+            line = self._file.readline()
+        if not line:
+            raise ConnectionError("search server closed the connection")
+        response = json.loads(line)
+        if not response['ok']:
+            # bad input (a malformed query) is a ValueError on both sides, and an index that
+            # failed to load an IndexLoadError, like in the local menu
+            kind = response.get('type')
+            if kind == 'ValueError':
+                raise ValueError(response['error'])
+            if kind == 'IndexLoadError':
+                raise IndexLoadError(response.get('index'), ServerError(response['error']))
+            raise ServerError(f"{kind}: {response['error']}")
+        return response['result']
+
+    def search(self, request):
+        results = RemoteResults(self, request)
+        order = tuple(tuple(key) for key in results.order) if results.order else None
+        return results, order
+
+    def sort(self, request, sort_key, is_inverted, then=()):
+        return RemoteRows(self, request, sort_key, is_inverted, then)
+
+    def rows(self, app_ids):
+        return self.call('rows', app_ids=list(app_ids))
+
+    def stats(self):
+        return self.call('stats')
+
+    def close(self):
+        self._file.close()
+        self._sock.close()
+
+
+class RemoteGames:
+    # Read-only stand-in for the game table: the TUI only calls get() for the rows on screen,
+    # and those mostly arrive with the pages of RemoteRows
+    def __init__(self, client):
+        self._client = client
+        self._rows = {}
+
+    def remember(self, rows):
+        if len(self._rows) > 100000:
+            self._rows.clear()
+        self._rows.update(rows)
+
+    def get(self, app_id, default=None):
+        app_id = str(app_id)
+        if app_id not in self._rows:
+            self.remember(self._client.rows([app_id]))
+        row = self._rows.get(app_id)
+        return row if row is not None else default
+
+    def __contains__(self, app_id):
+        return self.get(app_id) is not None
+
+
+class RemoteResults:
+    # Unsorted app_ids of a search held by the server, fetched PAGE_SIZE at a time. The TUI
+    # only needs their count, its sorts go through RemoteRows.
+    def __init__(self, client, request):
+        self._client = client
+        self._request = request
+        self._pages = {}
+        self._total = None
+        self.order = None
+        self._page(0)
+
+    def _page(self, number):
+        if number not in self._pages:
+            result = self._client.call('search', request=self._request, offset=number * PAGE_SIZE, limit=PAGE_SIZE)
+            self._total = result['total']
+            self.order = result['order']
+            self._pages[number] = result['results']
+        return self._pages[number]
+
+    def __len__(self):
+        return self._total
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._total))]
+        if index < 0:
+            index += self._total
+        if not 0 <= index < self._total:
+            raise IndexError(index)
+        return self._page(index // PAGE_SIZE)[index % PAGE_SIZE]
+
+
+class RemoteRows:
+    # Sorted app_ids of a search held by the server, fetched PAGE_SIZE at a time
+    def __init__(self, client, request, sort_key, is_inverted, then=()):
+        self._client = client
+        self._request = request
+        self._sort_key = sort_key
+        self._is_inverted = is_inverted
+        self._then = tuple(then)
+        self._pages = {}
+        self._total = None
+        self._page(0)
+
+    def _page(self, number):
+        if number not in self._pages:
+            result = self._client.call('sort', request=self._request, sort_key=self._sort_key,
+                                       inverted=self._is_inverted, then=self._then,
+                                       offset=number * PAGE_SIZE, limit=PAGE_SIZE)
+            self._total = result['total']
+            self._pages[number] = result['rows']
+            self._client.games.remember(result['games'])
+        return self._pages[number]
+
+    def __len__(self):
+        return self._total
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._total))]
+        if index < 0:
+            index += self._total
+        if not 0 <= index < self._total:
+            raise IndexError(index)
+        return self._page(index // PAGE_SIZE)[index % PAGE_SIZE]
+
+    # Only the first key changes direction; the TUI only asks for this without tie-breakers
+    def inverted(self):
+        return RemoteRows(self._client, self._request, self._sort_key, not self._is_inverted, self._then)
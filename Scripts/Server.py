@@ -0,0 +1,122 @@
+import argparse
+import json
+import os
+import socket
+import socketserver
+import sys
+import time
+from BPlusTree import BPlusTree, BPlusNode
+import main
+from IndexRegistry import IndexLoadError
+from SearchClient import DEFAULT_SERVER_ADDRESS, parse_address
+
+# Long-running search server: loads the game table and every index once and answers the
+# same searches as the menu (main.SearchService) for any number of clients at the same
+# time, over a Unix socket or localhost TCP. The protocol is one JSON object per line:
+#   {"op": "search", "request": {"kind": "tags", "value": "Indie, !RPG"}, "offset": 0, "limit": 50}
+#       -> {"ok": true, "result": {"total": n, "results": [app_id, ...], "order": null}}
+#   {"op": "sort", "request": {...}, "sort_key": "price", "inverted": false, "then": [["score", true]],
+#    "offset": 0, "limit": 50}
+#       -> {"ok": true, "result": {"total": n, "rows": [app_id, ...], "games": {app_id: row}}}
+#   {"op": "rows", "app_ids": [...]}, {"op": "stats"}, {"op": "ping"}
+# Errors come back as {"ok": false, "error": message, "type": exception class}, plus
+# "index": name when an index could not be loaded (IndexLoadError).
+# When ApplyDelta.py or Ingest.py replaces an index file, the indexes read from it are
+# loaded again on the next request (SearchService.refresh), so answers follow the files.
+# "python main.py --connect [ADDRESS]" runs the menu and the TUI on top of it.
+
+class Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                message = json.loads(line)
+                response = {'ok': True, 'result': self.server.dispatch(message)}
+            except IndexLoadError as e:
+                response = {'ok': False, 'error': str(e.error), 'type': 'IndexLoadError', 'index': e.name}
+            except Exception as e:
+                response = {'ok': False, 'error': str(e), 'type': type(e).__name__}
+            self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+
+# Clients never wait on each other here: the query cache makes only requests for the same
+# key wait for one computation, and lazily sorted rows lock their own filling
+class SearchServer:
+    def __init__(self, service):
+        self.service = service
+
+    def dispatch(self, message):
+        op = message.get('op')
+        if op == 'search':
+            offset, limit = page_bounds(message)
+            results, order = self.service.search(message['request'])
+            return {'total': len(results), 'results': list(results[offset:offset + limit]), 'order': order}
+        if op == 'sort':
+            offset, limit = page_bounds(message)
+            rows = self.service.sort(message['request'], message.get('sort_key', 'app_id'),
+                                     bool(message.get('inverted', False)), message.get('then', ()))
+            page = list(rows[offset:offset + limit])
+            return {'total': len(rows), 'rows': page, 'games': self.service.rows(page)}
+        if op == 'rows':
+            return self.service.rows(message['app_ids'])
+        if op == 'stats':
+            return self.service.stats()
+        if op == 'ping':
+            return 'pong'
+        raise ValueError(f"unknown op '{op}'")
+
+
+# (offset, limit) of the page a search or sort message asks for
+def page_bounds(message):
+    return max(0, int(message.get('offset', 0))), max(0, int(message.get('limit', 100)))
+
+
+class ThreadingTCPServer(socketserver.ThreadingTCPServer):
+    # a restarted server can bind again right away instead of waiting out TIME_WAIT
+    allow_reuse_address = True
+
+
+def make_server(address, search_server):
+    family, target = parse_address(address)
+    if family == socket.AF_UNIX:
+        if os.path.exists(target):
+            os.unlink(target) # left over from a server that did not shut down cleanly
+        server = socketserver.ThreadingUnixStreamServer(target, Handler)
+    else:
+        server = ThreadingTCPServer(target, Handler)
+    server.daemon_threads = True
+    server.dispatch = search_server.dispatch
+    return server
+
+
+def serve(argv):
+    parser = argparse.ArgumentParser(description="Serve catalog searches over a local socket")
+    parser.add_argument('address', nargs='?', default=DEFAULT_SERVER_ADDRESS,
+                        help="Unix socket path or HOST:PORT (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    indexes = main.build_registry()
+    start = time.perf_counter()
+    try:
+        for name in ['games'] + main.WARMUP_ORDER:
+            indexes.get(name)
+    except IndexLoadError as e:
+        sys.exit(f"error during data loading: {e}")
+    print(f"indexes loaded in {time.perf_counter() - start:.1f}s: {indexes.report()}")
+
+    server = make_server(args.address, SearchServer(main.SearchService(indexes)))
+    print(f"listening on {args.address}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if parse_address(args.address)[0] == socket.AF_UNIX and os.path.exists(args.address):
+            os.unlink(args.address)
+
+
+if __name__ == "__main__":
+    serve(sys.argv[1:])
@@ -1,31 +1,323 @@
-import requests
+import argparse
+import asyncio
 import csv
+import itertools
+import json
+import os
+import random
+import ssl
+import sys
 import time
+from bisect import bisect_right
+from urllib.parse import urlsplit
 
-with open("Data/new_games.csv", "r", newline='', encoding='utf-8') as file:
-    reader = csv.DictReader(file)
-    last_row = None
-    for row in reader:
-        last_row = row
-
-with open("Data/games.csv", "r", newline='', encoding='utf-8') as old_file, \
-    open("Data/new_games.csv", "a", newline='', encoding='utf-8') as new_file:
-
-    leitor = csv.DictReader(old_file)
-    campos = leitor.fieldnames
-    escritor = csv.DictWriter(new_file, fieldnames=campos)
-    for linha in leitor:
-        if(int(linha["app_id"]) <= int(last_row["app_id"])):
-            continue
-        url = "http://store.steampowered.com/api/appdetails?appids="+linha["app_id"]+"&cc=BR&filters=price_overview"
-        response = requests.get(url)
-        while(response.status_code != 200):
-            time.sleep(300)
-            response = requests.get(url)
-        data = response.json()##[linha["app_id"]]["data"]["price_overview"]["final_formatted"]
+# Atualiza o price_overview de todos os jogos de games.csv consultando a API appdetails da
+# Steam e grava as linhas em new_games.csv (que o ApplyDelta.py aplica nas estruturas).
+#
+# Em vez de um requests.get bloqueante por jogo, várias requisições ficam em voo ao mesmo
+# tempo numa única thread (asyncio), sobre um pool limitado de conexões keep-alive. Com
+# filters=price_overview a API aceita vários appids separados por vírgula, então cada
+# requisição traz um lote inteiro. Um token bucket segura o ritmo abaixo do limite da Steam
+# e respostas 429/5xx ou erros de rede voltam pra fila com backoff exponencial e jitter.
+#
+# O progresso fica em um checkpoint pequeno (quantas linhas do início de games.csv já foram
+# feitas + os intervalos de linhas concluídos fora de ordem depois disso), gravado de forma
+# atômica depois de cada lote, então retomar não precisa reler o new_games.csv. Um
+# new_games.csv do script antigo, sem checkpoint, continua depois do último app_id dele.
+#
+#   python Steam_price.py [--rate 0.6] [--concurrency 4] [--batch 100] [--base-url URL]
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'Data')
+BASE_URL = "http://store.steampowered.com"
+MAX_BACKOFF = 300           # o script antigo esperava 300 s a cada erro; agora é o teto
+REQUEST_TIMEOUT = 30
+
+
+class TokenBucket:
+    # rate fichas por segundo, acumulando no máximo burst
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock: # um de cada vez, assim quem chegou primeiro sai primeiro
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds):
+        # depois de um 429 ninguém manda nada por um tempo: a fila de fichas fica negativa
+        self.tokens = min(self.tokens, 0) - seconds * self.rate
+
+
+class HttpError(Exception):
+    def __init__(self, status, retry_after=None):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+class ConnectionPool:
+    # Cliente HTTP/1.1 mínimo sobre asyncio streams: no máximo `size` conexões abertas com o
+    # host, reaproveitadas entre requisições (keep-alive). Só faz GET, que é tudo que a API usa.
+    def __init__(self, base_url, size):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.ssl = ssl.create_default_context() if parts.scheme == "https" else None
+        self.prefix = parts.path.rstrip("/")
+        self._slots = asyncio.Semaphore(size)
+        self._idle = []
+
+    async def get(self, path):
+        async with self._slots:
+            reader, writer = self._idle.pop() if self._idle else await asyncio.open_connection(
+                self.host, self.port, ssl=self.ssl)
+            try:
+                status, headers, body = await asyncio.wait_for(self._roundtrip(reader, writer, path), REQUEST_TIMEOUT)
+            except BaseException:
+                writer.close()
+                raise
+            if headers.get("connection", "").lower() == "close":
+                writer.close()
+            else:
+                self._idle.append((reader, writer))
+            return status, headers, body
+
+    async def _roundtrip(self, reader, writer, path):
+        writer.write((f"GET {self.prefix}{path} HTTP/1.1\r\nHost: {self.host}\r\n"
+                      "Accept: application/json\r\nConnection: keep-alive\r\n\r\n").encode("ascii"))
+        await writer.drain()
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("conexão fechada pelo servidor")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+            body = b"".join(chunks)
+        elif "content-length" in headers:
+            body = await reader.readexactly(int(headers["content-length"]))
+        else:
+            body = await reader.read()
+            headers["connection"] = "close"
+        return status, headers, body
+
+    def close(self):
+        for _, writer in self._idle:
+            writer.close()
+        self._idle.clear()
+
+
+class Checkpoint:
+    # position: linhas do início de games.csv já gravadas; done: intervalos [início, fim) de
+    # linhas depois de position que terminaram antes das anteriores (lotes em paralelo acabam
+    # fora de ordem). Lotes vizinhos se juntam num intervalo só, então mesmo com um lote do
+    # começo preso no backoff o arquivo guarda um par de números por buraco, não por linha.
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.position = 0
+        self.done = []
+        if os.path.exists(file_path):
+            with open(file_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            self.position = state["position"]
+            # checkpoints antigos guardavam cada linha solta
+            self._add([(n, n + 1) if isinstance(n, int) else tuple(n) for n in state["done"]])
+
+    def __contains__(self, row_number):
+        if row_number < self.position:
+            return True
+        i = bisect_right(self.done, (row_number, float("inf"))) - 1
+        return i >= 0 and row_number < self.done[i][1]
+
+    def _add(self, ranges):
+        merged = []
+        for start, end in sorted(self.done + ranges):
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        while merged and merged[0][0] <= self.position:
+            self.position = max(self.position, merged.pop(0)[1])
+        self.done = merged
+
+    def mark(self, row_numbers):
+        ranges = []
+        for n in row_numbers:
+            if ranges and ranges[-1][1] == n:
+                ranges[-1] = (ranges[-1][0], n + 1)
+            else:
+                ranges.append((n, n + 1))
+        self._add(ranges)
+        self.save()
+
+    def save(self):
+        with open(self.file_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"position": self.position, "done": self.done}, f)
+        os.replace(self.file_path + ".tmp", self.file_path)
+
+    def seed(self, input_path, output_path):
+        # sem checkpoint, mas com um new_games.csv do script antigo: ele ia na ordem de
+        # games.csv e parava num app_id, então tudo até a linha desse app_id já foi feito
+        last = None
+        with open(output_path, "r", newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                last = row["app_id"]
+        if last is None:
+            return
+        last, prefix = int(last), 0
+        with open(input_path, "r", newline='', encoding='utf-8') as f:
+            for n, row in enumerate(csv.DictReader(f)):
+                app_id = int(row["app_id"])
+                if app_id == last:
+                    self.position = n + 1
+                    break
+                # sem a linha exata, vale a regra do script antigo (app_id <= último), até onde
+                # games.csv está em ordem
+                if app_id <= last and prefix == n:
+                    prefix = n + 1
+            else:
+                self.position = prefix
+        self.save()
+
+
+def parse_prices(payload, app_ids):
+    # {app_id: preço em centavos ou "\N"}. Jogos gratuitos ou sem preço vêm com data vazia
+    # ([]) ou success false; o preço vai em centavos, a mesma unidade do games.csv
+    prices = {}
+    for app_id in app_ids:
+        entry = payload.get(str(app_id)) or {}
+        data = entry.get("data") if entry.get("success") else None
         try:
-            data = data[linha["app_id"]]["data"]["price_overview"]["final_formatted"].replace("R$ ","")
-        except:
-            data = "\\N"
-        linha["price_overview"] = data
-        escritor.writerow(linha)
+            prices[app_id] = int(data["price_overview"]["final"])
+        except (TypeError, KeyError, ValueError):
+            prices[app_id] = "\\N"
+    return prices
+
+
+async def fetch_prices(pool, bucket, app_ids, cc):
+    # uma requisição pra todo o lote, tentando de novo até dar certo. Um 400 com vários
+    # appids divide o lote ao meio (algum appid pode estar derrubando a requisição inteira)
+    attempt = 0
+    while True:
+        await bucket.acquire()
+        try:
+            status, headers, body = await pool.get(
+                f"/api/appdetails?appids={','.join(map(str, app_ids))}&cc={cc}&filters=price_overview")
+            if status == 200:
+                return parse_prices(json.loads(body), app_ids)
+            raise HttpError(status, headers.get("retry-after"))
+        except HttpError as error:
+            if error.status == 400 and len(app_ids) > 1:
+                half = len(app_ids) // 2
+                first = await fetch_prices(pool, bucket, app_ids[:half], cc)
+                first.update(await fetch_prices(pool, bucket, app_ids[half:], cc))
+                return first
+            if error.status == 400 or error.status == 404:
+                return {app_id: "\\N" for app_id in app_ids}
+            delay = _backoff(attempt, error.retry_after)
+            if error.status == 429:
+                bucket.pause(delay)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError, IndexError):
+            delay = _backoff(attempt, None)
+        attempt += 1
+        await asyncio.sleep(delay)
+
+
+def _backoff(attempt, retry_after):
+    # exponencial com jitter "cheio" (uniforme entre 0 e o teto), respeitando o Retry-After
+    try:
+        return max(float(retry_after), 0)
+    except (TypeError, ValueError):
+        return random.uniform(0, min(MAX_BACKOFF, 2 ** attempt))
+
+
+async def scrape(args):
+    checkpoint = Checkpoint(args.checkpoint)
+    if not os.path.exists(args.checkpoint) and os.path.exists(args.output) and os.path.getsize(args.output):
+        checkpoint.seed(args.input, args.output)
+    pool = ConnectionPool(args.base_url, args.concurrency)
+    bucket = TokenBucket(args.rate, args.burst)
+    batches = asyncio.Queue(maxsize=args.concurrency * 2)
+    started = time.monotonic()
+    finished = 0
+
+    with open(args.input, "r", newline='', encoding='utf-8') as old_file:
+        reader = csv.DictReader(old_file)
+        fields = reader.fieldnames
+        new_output = not os.path.exists(args.output) or os.path.getsize(args.output) == 0
+        with open(args.output, "a", newline='', encoding='utf-8') as new_file:
+            writer = csv.DictWriter(new_file, fieldnames=fields)
+            if new_output:
+                writer.writeheader()
+
+            async def produce():
+                pending = ((n, row) for n, row in enumerate(reader) if n not in checkpoint)
+                while True:
+                    batch = list(itertools.islice(pending, args.batch))
+                    if not batch:
+                        break
+                    await batches.put(batch)
+                for _ in range(args.concurrency):
+                    await batches.put(None)
+
+            async def work():
+                nonlocal finished
+                while (batch := await batches.get()) is not None:
+                    prices = await fetch_prices(pool, bucket, [int(row["app_id"]) for _, row in batch], args.cc)
+                    for _, row in batch:
+                        row["price_overview"] = prices[int(row["app_id"])]
+                        writer.writerow(row)
+                    new_file.flush() # as linhas chegam no disco antes do checkpoint que as marca
+                    checkpoint.mark(n for n, _ in batch)
+                    finished += len(batch)
+                    if not args.quiet:
+                        elapsed = time.monotonic() - started
+                        print(f"{finished} jogos ({finished / elapsed:.1f}/s), linha {checkpoint.position}", flush=True)
+
+            try:
+                await asyncio.gather(produce(), *(work() for _ in range(args.concurrency)))
+            finally:
+                pool.close()
+    return finished
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Atualiza os preços de games.csv pela API da Steam")
+    parser.add_argument("--input", default=os.path.join(DATA_DIR, "games.csv"))
+    parser.add_argument("--output", default=os.path.join(DATA_DIR, "new_games.csv"))
+    parser.add_argument("--checkpoint", default=os.path.join(DATA_DIR, "new_games.ckpt"))
+    parser.add_argument("--base-url", default=BASE_URL, help="troque por um servidor local nos testes")
+    parser.add_argument("--cc", default="BR", help="país da loja (moeda dos preços)")
+    parser.add_argument("--rate", type=float, default=0.6, help="requisições por segundo")
+    parser.add_argument("--burst", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=4, help="conexões/requisições em voo")
+    parser.add_argument("--batch", type=int, default=100, help="appids por requisição")
+    parser.add_argument("--quiet", action="store_true")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(scrape(parse_args(sys.argv[1:])))
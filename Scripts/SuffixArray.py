@@ -0,0 +1,180 @@
+import csv
+import pickle
+from array import array
+from bisect import bisect_left, bisect_right
+from multiprocessing import get_context
+
+# Substring index over every game name at once: all lowercased names go into one utf-8
+# buffer separated by \0, and the suffix array holds the start of every suffix in
+# sorted order. A query is two binary searches for the block of suffixes that start
+# with it, so memory stays a small multiple of the text instead of one node per suffix.
+SEPARATOR = b"\0"
+# Bytes of each suffix a sort pass compares; suffixes still tied after them go another
+# pass on the next bytes, so the sort never holds a copy of a whole suffix
+SORT_WINDOW = 64
+# Runs this small are sorted on their whole suffixes in one go; copying them costs little
+SMALL_RUN = 256
+
+class SuffixArray:
+    def __init__(self, text, starts, app_ids, sa, owners=None):
+        self.text = text          # bytes, names joined by SEPARATOR
+        self.starts = starts      # array('I'), offset of each name in text
+        self.app_ids = app_ids    # array('I'), app_id of each name
+        self.sa = sa              # array('I'), suffix offsets sorted by suffix
+        # array('I') aligned with sa: the app_id each suffix belongs to, so a search reads its
+        # hits straight off a slice (4 more bytes per suffix than bisecting starts per hit)
+        self.owners = _owners(starts, app_ids, sa) if owners is None else owners
+
+    # names.sa files from before owners was stored get it computed once on load
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if 'owners' not in state:
+            self.owners = _owners(self.starts, self.app_ids, self.sa)
+
+    @staticmethod
+    def build(names, processes=None):
+        # names: iterable of (app_id, name); processes > 1 sorts the buckets in a process pool
+        parts = []
+        starts = array('I')
+        app_ids = array('I')
+        offset = 0
+        for app_id, name in names:
+            if not name or name == '\\N':
+                continue
+            encoded = name.lower().encode('utf-8').replace(SEPARATOR, b"")
+            starts.append(offset)
+            app_ids.append(int(app_id))
+            parts.append(encoded)
+            offset += len(encoded) + 1
+        text = SEPARATOR.join(parts)
+
+        # Group suffixes by their first byte and sort each group on its own; the groups
+        # come out already in order, so joining them is the whole merge. Suffixes that
+        # start in the middle of a utf-8 character can never match a query, so skip them.
+        buckets = {}
+        for position, byte in enumerate(text):
+            if byte != 0 and not 0x80 <= byte < 0xC0:
+                buckets.setdefault(byte, []).append(position)
+
+        if processes is not None and processes > 1:
+            # largest buckets first so no worker is left with a big one at the end
+            order = sorted(buckets, key=lambda byte: len(buckets[byte]), reverse=True)
+            # The workers are spawned, not forked: main.py builds this from its warmup thread,
+            # and a fork there would copy locks that other threads hold
+            with get_context('spawn').Pool(processes, initializer=_init_sort_worker, initargs=(text,)) as pool:
+                sorted_buckets = dict(zip(order, pool.imap(_sort_bucket, [buckets[byte] for byte in order])))
+        else:
+            sorted_buckets = {byte: _sort_suffixes(text, positions) for byte, positions in buckets.items()}
+
+        sa = array('I')
+        for byte in sorted(sorted_buckets):
+            sa.extend(sorted_buckets[byte])
+        del buckets, sorted_buckets
+        # app_id of every byte of text, read once per suffix for owners
+        owner_at = array('I', bytes(4 * len(text)))
+        for start, end, app_id in zip(starts, starts[1:].tolist() + [len(text) + 1], app_ids):
+            owner_at[start:end - 1] = array('I', [app_id]) * (end - 1 - start)
+        return SuffixArray(text, starts, app_ids, sa, array('I', map(owner_at.__getitem__, sa)))
+
+    # Offsets in sa of the block of suffixes starting with substring
+    def _block(self, substring):
+        query = substring.encode('utf-8')
+        size = len(query)
+        text = self.text
+
+        def prefix(position):
+            return text[position:position + size]
+
+        return bisect_left(self.sa, query, key=prefix), bisect_right(self.sa, query, key=prefix)
+
+    # Same interface as SuffixTree: list of unique app_ids whose name contains substring
+    def search_substring(self, substring, limit=None):
+        lo, hi = self._block(substring)
+        if limit is None:
+            return list(set(self.owners[lo:hi]))
+        results = set()
+        for i in range(lo, hi):
+            results.add(self.owners[i])
+            if len(results) >= limit:
+                break
+        return list(results)
+
+    # Number of suffixes starting with substring: an upper bound on the matching names,
+    # found with the two binary searches alone
+    def count_hits(self, substring):
+        lo, hi = self._block(substring)
+        return hi - lo
+
+    def count_substring(self, substring):
+        return len(self.search_substring(substring))
+
+    def save_tree(self, file_path):
+        with open(file_path, 'wb') as f:
+            pickle.dump(self, f)
+
+    @staticmethod
+    def load_tree(file_path):
+        with open(file_path, 'rb') as f:
+            return pickle.load(f)
+
+    @staticmethod
+    def build_from_csv(csv_file_path, processes=None):
+        with open(csv_file_path, 'r', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            next(reader)  # Skip header
+            return SuffixArray.build(((row[0], row[1]) for row in reader if len(row) > 1), processes)
+
+def _owners(starts, app_ids, sa):
+    return array('I', (app_ids[bisect_right(starts, position) - 1] for position in sa))
+
+def _sort_suffixes(text, positions):
+    # Each suffix is compared only up to the end of its own name, SORT_WINDOW bytes per pass:
+    # a run of suffixes whose whole window is equal (and didn't end in it) is sorted again on
+    # the next window. Names are mostly shorter than one window, so most buckets take one pass.
+    def suffix(position):
+        end = text.find(SEPARATOR, position)
+        return text[position:end] if end != -1 else text[position:]
+
+    pending = [(0, len(positions), 0)]
+    while pending:
+        lo, hi, depth = pending.pop()
+        if depth and hi - lo <= SMALL_RUN:
+            positions[lo:hi] = sorted(positions[lo:hi], key=suffix)
+            continue
+        truncated = False
+
+        def window(position):
+            nonlocal truncated
+            start = position + depth
+            end = text.find(SEPARATOR, start, start + SORT_WINDOW)
+            if end != -1:
+                return text[start:end]
+            key = text[start:start + SORT_WINDOW]
+            truncated = truncated or len(key) == SORT_WINDOW
+            return key
+
+        # stable, so equal suffixes keep their (ascending) position order in every pass
+        run = positions[lo:hi]
+        run.sort(key=window)
+        positions[lo:hi] = run
+        if not truncated:
+            continue
+        keys = list(map(window, run))
+        i = 0
+        while i < len(keys):
+            j = i + 1
+            while j < len(keys) and keys[j] == keys[i]:
+                j += 1
+            if j - i > 1 and len(keys[i]) == SORT_WINDOW:
+                pending.append((lo + i, lo + j, depth + SORT_WINDOW))
+            i = j
+    return positions
+
+_worker_text = None
+
+def _init_sort_worker(text):
+    global _worker_text
+    _worker_text = text
+
+def _sort_bucket(positions):
+    return array('I', _sort_suffixes(_worker_text, positions))
@@ -0,0 +1,129 @@
+import csv
+import os
+import pickle
+import sys
+import tempfile
+import time
+import tracemalloc
+from BPlusTree import BPlusTree, BPlusNode
+from PatriciaTree import SuffixTree
+
+# Benchmark de memória do SuffixTree: monta a árvore com os primeiros N nomes da
+# nametree.bin (o mesmo caminho do build_from_csv) e mostra quantos bytes cada nome
+# indexado custa, no layout de nó antigo (antes) e no atual (depois).
+# Uso: python bench_patricia_memory.py [N]
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'Data')
+
+
+# Cópia do nó de antes dos __slots__: __dict__ em todo nó, dict de filhos sempre criado,
+# lista de valores mesmo com um app_id só e app_ids como strings. Só o insert, que é o
+# que o build usa.
+class LegacyNode:
+    def __init__(self, key='', value=None):
+        self.key = key
+        self.children = {}
+        self.values = []
+        if value is not None:
+            self.values.append(value)
+
+
+class LegacySuffixTree:
+    def __init__(self):
+        self.root = LegacyNode()
+
+    def insert(self, key, value):
+        node = self.root
+        while True:
+            child = node.children.get(key[0]) if key else None
+            if child is None:
+                node.children[key[0]] = LegacyNode(key, value)
+                return
+            common = 0
+            for a, b in zip(key, child.key):
+                if a != b:
+                    break
+                common += 1
+            if common == len(child.key):
+                key = key[common:]
+                node = child
+                if not key:
+                    if value not in child.values:
+                        child.values.append(value)
+                    return
+                continue
+            internal = LegacyNode(child.key[:common])
+            node.children[key[0]] = internal
+            child.key = child.key[common:]
+            internal.children[child.key[0]] = child
+            if key[common:]:
+                internal.children[key[common]] = LegacyNode(key[common:], value)
+            else:
+                internal.values.append(value)
+            return
+
+    @staticmethod
+    def build_from_csv(csv_file_path):
+        tree = LegacySuffixTree()
+        with open(csv_file_path, 'r', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            next(reader)
+            for row in reader:
+                # como o build_from_csv antigo: o app_id fica como a string do csv
+                if len(row) > 1 and row[1] and row[1] != '\\N':
+                    for i in range(len(row[1])):
+                        tree.insert(row[1][i:].lower(), row[0])
+        return tree
+
+
+def measure(build, csv_path):
+    # (segundos, bytes em memória, bytes do pickle) de uma árvore montada por build
+    tracemalloc.start()
+    start = time.perf_counter()
+    tree = build(csv_path)
+    elapsed = time.perf_counter() - start
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    with tempfile.TemporaryFile() as f:
+        pickle.dump(tree, f)
+        pickled = f.tell()
+    return elapsed, used, pickled
+
+
+def main():
+    limit = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    with open(os.path.join(DATA_DIR, "nametree.bin"), "rb") as f:
+        name_tree = pickle.load(f)
+
+    node = name_tree.root
+    while not node.leaf:
+        node = node.children[0]
+    rows = []
+    while node is not None and len(rows) < limit:
+        rows.extend((app_id, name) for name, app_id in zip(node.keys, node.values))
+        node = node.next
+    rows = rows[:limit]
+
+    with tempfile.NamedTemporaryFile("w", suffix=".csv", newline="", encoding="utf-8", delete=False) as f:
+        writer = csv.writer(f)
+        writer.writerow(["app_id", "name"])
+        writer.writerows(rows)
+        csv_path = f.name
+
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10000)) # o pickle desce a árvore recursivamente
+    try:
+        before = measure(LegacySuffixTree.build_from_csv, csv_path)
+        after = measure(SuffixTree.build_from_csv, csv_path)
+    finally:
+        os.remove(csv_path)
+
+    count = len(rows)
+    print(f"nomes indexados:  {count}")
+    print(f"{'':18}{'antes':>10}{'depois':>10}")
+    print(f"{'tempo de build:':18}{before[0]:>9.2f}s{after[0]:>9.2f}s")
+    print(f"{'memória total:':18}{before[1] / 2**20:>6.1f} MiB{after[1] / 2**20:>6.1f} MiB")
+    print(f"{'bytes por nome:':18}{before[1] / count:>10.0f}{after[1] / count:>10.0f}")
+    print(f"{'pickle por nome:':18}{before[2] / count:>10.0f}{after[2] / count:>10.0f}")
+    print(f"redução de memória: {1 - after[1] / before[1]:.0%}")
+
+if __name__ == "__main__":
+    main()
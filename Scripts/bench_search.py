@@ -0,0 +1,64 @@
+import os
+import pickle
+import random
+import time
+from BPlusTree import BPlusTree, BPlusNode
+
+# Microbenchmark da busca nas árvores B+: reconstrói as árvores de nome, preço e
+# tags com vários graus mínimos (t) e mede a latência média de search(), comparando
+# a busca binária atual com a varredura linear que o search usava antes.
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'Data')
+T_VALUES = [7, 25, 50, 100, 200, 400]
+SAMPLES = 2000
+
+
+def leaf_items(tree):
+    node = tree.root
+    while not node.leaf:
+        node = node.children[0]
+    while node is not None:
+        yield from zip(node.keys, node.values)
+        node = node.next
+
+def linear_search(node, key):
+    # a busca antiga, só pra comparação
+    while True:
+        i = 0
+        while i < len(node.keys) and key > node.keys[i]:
+            i += 1
+        if node.leaf:
+            return node.values[i] if i < len(node.keys) and key == node.keys[i] else None
+        if i < len(node.keys) and key == node.keys[i]:
+            i += 1
+        node = node.children[i]
+
+def per_call(fn, keys):
+    start = time.perf_counter()
+    for key in keys:
+        fn(key)
+    return (time.perf_counter() - start) / len(keys) * 1e6
+
+def main():
+    tag_file = "tags.bin" if os.path.exists(os.path.join(DATA_DIR, "tags.bin")) else "categories.bin"
+    sources = [("name", "nametree.bin"), ("price", "pricetree.bin"), ("tag", tag_file)]
+    random.seed(0)
+
+    print(f"{'árvore':<8}{'t':>5}{'altura':>8}{'bisect (us)':>14}{'linear (us)':>14}")
+    for label, file_name in sources:
+        with open(os.path.join(DATA_DIR, file_name), "rb") as f:
+            items = list(leaf_items(pickle.load(f)))
+        items.sort(key=lambda item: item[0])
+        keys = [key for key, _ in random.choices(items, k=SAMPLES)]
+
+        for t in T_VALUES:
+            tree = BPlusTree.bulk_load(items, t)
+            height, node = 1, tree.root
+            while not node.leaf:
+                node = node.children[0]
+                height += 1
+            fast = per_call(tree.search, keys)
+            slow = per_call(lambda key: linear_search(tree.root, key), keys)
+            print(f"{label:<8}{t:>5}{height:>8}{fast:>14.2f}{slow:>14.2f}")
+
+if __name__ == "__main__":
+    main()
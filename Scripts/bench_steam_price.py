@@ -0,0 +1,126 @@
+import asyncio
+import csv
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+import Steam_price
+
+# Roda o Steam_price.py contra um servidor local que imita a API appdetails: latência
+# variável, 429 com Retry-After, 503, conexões derrubadas no meio e um appid "venenoso"
+# que faz a requisição em lote dar 400. Interrompe o scraper no meio, retoma pelo checkpoint
+# e confere que todo jogo saiu com o preço certo.
+# Uso: python bench_steam_price.py [jogos] [seed]
+POISON = 13
+LATENCY = (0.01, 0.05)
+
+
+def price_of(app_id):
+    # preço determinístico por app_id; múltiplos de 7 são gratuitos (sem price_overview)
+    return None if app_id % 7 == 0 else (app_id * 37) % 20000 + 99
+
+
+class FakeSteam(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # keep-alive, como a Steam
+    requests = 0
+    rng = random.Random()
+
+    def do_GET(self):
+        FakeSteam.requests += 1
+        time.sleep(self.rng.uniform(*LATENCY))
+        roll = self.rng.random()
+        if roll < 0.05:
+            return self._send(429, b"", {"Retry-After": "0.2"})
+        if roll < 0.08:
+            return self._send(503, b"")
+        if roll < 0.10:
+            self.close_connection = True # derruba a conexão sem resposta
+            return
+        query = parse_qs(urlsplit(self.path).query)
+        app_ids = [int(a) for a in query["appids"][0].split(",")]
+        if len(app_ids) > 1 and POISON in app_ids:
+            return self._send(400, b"null")
+        payload = {}
+        for app_id in app_ids:
+            price = price_of(app_id)
+            data = [] if price is None else {"price_overview": {"currency": "BRL", "final": price}}
+            payload[str(app_id)] = {"success": app_id != POISON, "data": data}
+        self._send(200, json.dumps(payload).encode())
+
+    def _send(self, status, body, headers={}):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class QuietServer(ThreadingHTTPServer):
+    # a interrupção derruba conexões no meio da resposta, o que não é erro do teste
+    def handle_error(self, request, client_address):
+        pass
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    FakeSteam.rng.seed(seed)
+    server = QuietServer(("127.0.0.1", 0), FakeSteam)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        games = os.path.join(tmp, "games.csv")
+        app_ids = random.Random(seed).sample(range(1, 3_000_000), count - 1) + [POISON]
+        with open(games, "w", newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(["app_id", "name", "release_date", "price_overview", "positive", "negative"])
+            writer.writerows([app_id, f"Game {app_id}", 20240101, 0, 1, 1] for app_id in app_ids)
+
+        args = Steam_price.parse_args([
+            "--input", games, "--output", os.path.join(tmp, "new_games.csv"),
+            "--checkpoint", os.path.join(tmp, "new_games.ckpt"),
+            "--base-url", f"http://127.0.0.1:{server.server_port}",
+            "--rate", "200", "--burst", "20", "--concurrency", "8", "--batch", "100", "--quiet"])
+
+        async def interrupted():
+            # para o scraper no meio, como um Ctrl+C ou queda da máquina
+            task = asyncio.create_task(Steam_price.scrape(args))
+            await asyncio.sleep(0.5)
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+        start = time.perf_counter()
+        asyncio.run(interrupted())
+        with open(args.checkpoint, encoding="utf-8") as f:
+            print(f"interrompido: checkpoint {f.read()[:80]}")
+        asyncio.run(Steam_price.scrape(args))
+        elapsed = time.perf_counter() - start
+
+        with open(args.output, newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        prices = {int(row["app_id"]): row["price_overview"] for row in rows}
+        expected = {app_id: str(price_of(app_id) if price_of(app_id) is not None and app_id != POISON else "\\N")
+                    for app_id in app_ids}
+        if prices != expected:
+            wrong = [a for a in expected if prices.get(a) != expected[a]][:5]
+            raise AssertionError(f"preços errados ou faltando, ex.: {wrong}")
+        print(f"{count} jogos em {elapsed:.1f}s com {FakeSteam.requests} requisições "
+              f"({len(rows) - count} linhas repetidas pela interrupção): ok")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,10 +2,19 @@ import sys
 import pickle
 import curses
 import os
-from tui import main as tui_main
-from BPlusTree import BPlusTree, BPlusNode
+import threading
+from tui import main as tui_main, sort_rows
+from BPlusTree import BPlusTree, BPlusNode, MappedBPlusTree
 from collections import defaultdict
 from PatriciaTree import SuffixTree
+from SuffixArray import SuffixArray
+from RankIndex import RankIndex, COLUMN_ORDERINGS, RANKS_VERSION
+from GameTable import GameTable
+from Bitmap import Bitmap, as_bitmap
+from Query import Context, run_query, tokenize, LATEST_RELEASE
+from IndexRegistry import IndexRegistry, IndexLoadError
+from QueryCache import QueryCache, file_generation
+from SearchClient import SearchClient, ServerError, DEFAULT_SERVER_ADDRESS
 
 # We only load the csv in case we need to rebuild the tree
 CSV_FILE_PATH = os.path.join(os.path.dirname(__file__), '..', 'Data', 'games.csv')
@@ -14,6 +23,7 @@ CSV_FILE_PATH = os.path.join(os.path.dirname(__file__), '..', 'Data', 'games.csv
 # This is an ugly fix, but at least now it works from anywhere, which is not required, but good.
 DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'Data')
 GAMES_BIN_PATH = os.path.join(DATA_DIR, 'games.bin')
+GAMES_TABLE_PATH = os.path.join(DATA_DIR, 'games.tbl')
 CATEGORIES_BIN_PATH = os.path.join(DATA_DIR, 'categories.bin')
 TAGS_BIN_PATH = os.path.join(DATA_DIR, 'tags.bin')
 NAMETREE_BIN_PATH = os.path.join(DATA_DIR, 'nametree.bin')
@@ -21,8 +31,123 @@ PRICETREE_BIN_PATH = os.path.join(DATA_DIR, 'pricetree.bin')
 RELEASETREE_BIN_PATH = os.path.join(DATA_DIR, 'releasetree.bin')
 REVIEWTREE_BIN_PATH = os.path.join(DATA_DIR, 'reviewtree.bin')
 PATRICIA_PATH = os.path.join(os.path.dirname(__file__), '..', 'Data', 'patricia.bin')
+SUFFIX_ARRAY_PATH = os.path.join(DATA_DIR, 'names.sa')
 
-def display_menu(bad_option, no_results, last_input, last_search, BLINK, BLUE, RED, RESET):
+# Which index answers name substring searches: 'suffix_array' or 'patricia'
+SUBSTRING_ENGINE = 'suffix_array'
+RANKS_PATH = os.path.join(DATA_DIR, 'ranks.bin')
+
+TREE_PATHS = {
+    'categories': CATEGORIES_BIN_PATH,
+    'tags': TAGS_BIN_PATH,
+    'name': NAMETREE_BIN_PATH,
+    'price': PRICETREE_BIN_PATH,
+    'release': RELEASETREE_BIN_PATH,
+    'review': REVIEWTREE_BIN_PATH,
+}
+TREE_INDEXES = {name: name for name in TREE_PATHS}
+RANKED_TREES = ['name', 'price', 'release', 'review']
+
+# Search results and sorted result lists are cached up to this many bytes. Any change to
+# these files (a rebuild, ApplyDelta.py) invalidates the cached entries.
+QUERY_CACHE_BYTES = 64 * 1024 * 1024
+# Index file -> the indexes loaded from it, reloaded when the file changes
+INDEX_SOURCES = {GAMES_TABLE_PATH: ['games', 'ranks'], SUFFIX_ARRAY_PATH: ['substring'], PATRICIA_PATH: ['substring']}
+INDEX_SOURCES.update({os.path.splitext(path)[0] + ext: [name] + (['ranks'] if name in RANKED_TREES else [])
+                      for name, path in TREE_PATHS.items() for ext in ('.bin', '.bpt')})
+INDEX_FILES = list(INDEX_SOURCES)
+
+# Load the remaining indexes on a background thread after the menu is up, most used first
+WARMUP = True
+WARMUP_ORDER = ['substring', 'tags', 'categories', 'ranks', 'name', 'price', 'release', 'review']
+
+# Opens the paged (.bpt) version of a tree if BinToPaged.py already generated it,
+# so only the pages a search touches get read. Falls back to the pickled .bin, also when
+# the .bin is newer: BinaryDict.py, CsvToBin.py, ordering.py and PostingsToBitmap.py
+# rewrite only the .bin, and the old .bpt would answer with stale data.
+def load_tree(bin_path):
+    paged_path = os.path.splitext(bin_path)[0] + '.bpt'
+    if os.path.exists(paged_path) and (
+        not os.path.exists(bin_path) or os.path.getmtime(paged_path) >= os.path.getmtime(bin_path)
+    ):
+        return MappedBPlusTree(paged_path)
+    with open(bin_path, 'rb') as f:
+        return pickle.load(f)
+
+# The rank index is derived from the trees and the game table, so it is rebuilt whenever
+# one of them is newer
+def load_ranks(trees, tree_paths, games):
+    def newest(path):
+        paged_path = os.path.splitext(path)[0] + '.bpt'
+        return max(os.path.getmtime(p) for p in (path, paged_path) if os.path.exists(p))
+
+    sources = tree_paths + ([GAMES_TABLE_PATH] if os.path.exists(GAMES_TABLE_PATH) else [])
+    if os.path.exists(RANKS_PATH) and os.path.getmtime(RANKS_PATH) >= max(newest(p) for p in sources):
+        try:
+            ranks = RankIndex.load(RANKS_PATH)
+            # files from another version (e.g. before the key values or the app_id tie order)
+            if getattr(ranks, 'version', 1) == RANKS_VERSION and all(k in ranks.orders for k in COLUMN_ORDERINGS):
+                return ranks
+        except Exception:
+            pass
+    ranks = RankIndex.build(trees, games)
+    ranks.save(RANKS_PATH)
+    return ranks
+
+# Maps the columnar games.tbl; the first run after BinaryDict.py converts games.bin into it
+def load_games():
+    if os.path.exists(GAMES_TABLE_PATH) and (
+        not os.path.exists(GAMES_BIN_PATH) or os.path.getmtime(GAMES_TABLE_PATH) >= os.path.getmtime(GAMES_BIN_PATH)
+    ):
+        return GameTable.load(GAMES_TABLE_PATH)
+    with open(GAMES_BIN_PATH, 'rb') as f:
+        GameTable.from_dict(pickle.load(f)).save(GAMES_TABLE_PATH)
+    return GameTable.load(GAMES_TABLE_PATH)
+
+# The substring index picked by SUBSTRING_ENGINE, built and saved if it is missing
+def load_substring_index(games_data):
+    if SUBSTRING_ENGINE == 'suffix_array':
+        return load_suffix_array(games_data)
+    try:
+        return SuffixTree.load_tree(PATRICIA_PATH)
+    except Exception:
+        substring_index = SuffixTree.build_from_csv(CSV_FILE_PATH, processes=os.cpu_count())
+        substring_index.save_tree(PATRICIA_PATH)
+        return substring_index
+
+# Loads the suffix array, building it from the names in the game table if needed
+def load_suffix_array(games_data):
+    try:
+        return SuffixArray.load_tree(SUFFIX_ARRAY_PATH)
+    except Exception:
+        names = ((app_id, games_data.name(i)) for i, app_id in enumerate(games_data.ids))
+        index = SuffixArray.build(names, processes=os.cpu_count())
+        index.save_tree(SUFFIX_ARRAY_PATH)
+        return index
+
+# Registers every index with its loader; nothing is read from disk until it is first used
+def build_registry():
+    indexes = IndexRegistry()
+    indexes.register('games', load_games)
+    for name, path in TREE_PATHS.items():
+        indexes.register(name, lambda path=path: load_tree(path))
+    trees = indexes.view(TREE_INDEXES)
+    indexes.register('ranks', lambda: load_ranks(trees, [TREE_PATHS[name] for name in RANKED_TREES],
+                                                 indexes.get('games')))
+    indexes.register('substring', lambda: load_substring_index(indexes.get('games')))
+    return indexes
+
+# Same terms in any order (and alternatives in any order) are the same search
+def normalize_keys(value):
+    terms = []
+    for term in value.split(','):
+        negated = term.strip().startswith('!')
+        alternatives = sorted(k.strip() for k in term.strip().lstrip('!').split('|') if k.strip())
+        if alternatives:
+            terms.append(('!' if negated else '') + '|'.join(alternatives))
+    return tuple(sorted(terms))
+
+def display_menu(bad_option, no_results, last_input, last_search, BLINK, BLUE, RED, RESET, load_report="", cache_report=""):
     os.system('cls' if os.name == 'nt' else 'clear') # Clear screen before displaying menu
     if bad_option:
         print(f"{BLUE}Invalid option '{last_input}', please try again.{RESET}")
@@ -33,8 +158,12 @@ def display_menu(bad_option, no_results, last_input, last_search, BLINK, BLUE, R
 ▀▀█  █  █▀▀ █▀█ █ █{RESET}{BLINK}  █  █ █ █ █{RESET}{BLUE}   ▀▀█ █ █ █▀▄  █ 
 ▀▀▀  ▀  ▀▀▀ ▀ ▀ ▀ ▀{RESET}{BLINK} ▀▀▀ ▀ ▀ ▀▀▀{RESET}{BLUE}   ▀▀█ ▀▀▀ ▀ ▀  ▀{RESET}
 """)
+    if load_report:
+        print(f"Indexes: {load_report}")
+    if cache_report:
+        print(f"Cache: {cache_report}")
     print(f"""Press {RED}q{RESET} to quit at any time.
-Search by: [{BLUE}1{RESET}] app_id, [{BLUE}2{RESET}] name, [{BLUE}3{RESET}] categories, [{BLUE}4{RESET}] tags
+Search by: [{BLUE}1{RESET}] app_id, [{BLUE}2{RESET}] name, [{BLUE}3{RESET}] categories, [{BLUE}4{RESET}] tags, [{BLUE}5{RESET}] price range, [{BLUE}6{RESET}] release date range, [{BLUE}7{RESET}] query
 Enter choice: """, end="")
 
 # Returns a single app_id if it exists in games_data
@@ -48,31 +177,175 @@ def search_by_name(name_tree, name):
     result = name_tree.search(name)
     return result if result is not None else []
 
-def search_by_multiple_keys(tree, value):
+# Returns the app_ids whose key lies in [lo, hi], walking only the leaves in that range
+def search_by_range(tree, lo, hi):
+    results = []
+    for _, value in tree.range(lo, hi):
+        if isinstance(value, list):
+            results.extend(value)
+        else:
+            results.append(value)
+    return results
+
+# Reads a price in R$ ("10" or "10,50") as cents, the unit the price tree uses
+def parse_price(value):
+    if not value:
+        return None
+    return round(float(value.replace(',', '.')) * 100)
+
+# Reads "YYYY" or "YYYY/MM/DD" as the YYYYMMDD int the release tree uses.
+# A bare year means the whole year, so it depends on which end of the range it is.
+def parse_date(value, end_of_range):
+    if not value:
+        return None
+    parts = value.split('/')
+    if len(parts) == 1:
+        return int(parts[0]) * 10000 + (1231 if end_of_range else 101)
+    year, month, day = (int(p) for p in parts)
+    return year * 10000 + month * 100 + day
+
+# Every comma-separated term must match. Inside a term "a | b" matches either key,
+# and a leading "!" excludes the key, e.g. "Co-op, Strategy, !Early Access"
+def search_by_multiple_keys(tree, value, games_data=None):
     values = value.strip().split(',')
     chosen_keys = [v.strip() for v in values if v.strip()]
     if not chosen_keys:
         print("No values entered.")
         return []
-    
-    # Get initial set of IDs from the first key
-    first_ids = tree.search(chosen_keys[0])
-    if not first_ids:
-        print(f"'{chosen_keys[0]}' not found.")
-        return []
-    
-    app_ids = set(first_ids)
-    
-    # Intersect with IDs from the remaining keys
-    for key in chosen_keys[1:]:
-        ids = tree.search(key)
-        if not ids:
-            print(f"'{key}' not found.")
+
+    required, excluded = [], []
+    for term in chosen_keys:
+        negated = term.startswith('!')
+        alternatives = [k.strip() for k in term.lstrip('!').split('|') if k.strip()]
+        postings = [p for p in (as_bitmap(tree.search(k)) for k in alternatives) if p]
+        if not postings:
+            if negated:
+                continue
+            print(f"'{term}' not found.")
             return []
-        app_ids &= set(ids)
-        
+        (excluded if negated else required).append(Bitmap.union_all(postings) if len(postings) > 1 else postings[0])
+
+    # Smallest posting list first, stopping as soon as the intersection is empty
+    if required:
+        app_ids = Bitmap.intersect_all(required)
+    elif games_data is not None:
+        app_ids = Bitmap.from_iterable(games_data.ids)
+    else:
+        return []
+    for bitmap in excluded:
+        if not app_ids:
+            break
+        app_ids = app_ids - bitmap
+
     return list(app_ids)
 
+# Runs the searches, the sorts and the row lookups over the loaded indexes, with the query
+# cache in front. The menu below uses it directly and Server.py exposes the same calls to
+# other processes, so both see the same results. A search request is a dict:
+#   {"kind": "app_id" | "name" | "categories" | "tags", "value": str}
+#   {"kind": "price" | "release", "lo": int or None, "hi": int or None}
+#   {"kind": "query", "text": str}
+class SearchService:
+    def __init__(self, indexes, cache_bytes=QUERY_CACHE_BYTES):
+        self.indexes = indexes
+        self.games = indexes.proxy('games')
+        self.trees = indexes.view(TREE_INDEXES)
+        self.ranks = indexes.proxy('ranks')
+        self.substring_index = indexes.proxy('substring')
+        self.context = Context(self.games, self.trees, self.substring_index)
+        self._files = file_generation(INDEX_FILES)
+        self._loaded_files = self._files()
+        self._reload_lock = threading.Lock()
+        # the cache reads the generation through refresh(), so entries are dropped and the
+        # indexes they came from reloaded at the same moment
+        self.cache = QueryCache(cache_bytes, self.refresh)
+
+    # Index files stamp. When a file changed since its indexes were loaded (ApplyDelta.py,
+    # Ingest.py), those indexes are dropped from the registry so the next use reads the new
+    # file instead of answering from the old trees or the old mapping of games.tbl.
+    def refresh(self):
+        stamp = self._files()
+        if stamp != self._loaded_files:
+            with self._reload_lock:
+                if stamp != self._loaded_files:
+                    changed = {name for path, old, new in zip(INDEX_FILES, self._loaded_files, stamp)
+                               if old != new for name in INDEX_SOURCES[path]}
+                    self.indexes.reset(changed)
+                    # the context keeps the set of every app_id, so it goes too
+                    self.context = Context(self.games, self.trees, self.substring_index)
+                    self._loaded_files = stamp
+        return stamp
+
+    @staticmethod
+    def cache_key(request):
+        kind = request['kind']
+        if kind in ('price', 'release'):
+            return (kind, request.get('lo'), request.get('hi'))
+        if kind == 'query':
+            # the tokens, so spacing between terms doesn't matter but quoted values stay as typed
+            return (kind, tuple(tokenize(request['text'])))
+        if kind in ('categories', 'tags'):
+            return (kind, normalize_keys(request['value']))
+        if kind == 'name':
+            return (kind, request['value'].lower())
+        if kind == 'app_id':
+            return (kind, str(request['value']).strip())
+        raise ValueError(f"unknown search kind '{kind}'")
+
+    # (results, order): the matching app_ids and, for queries with ORDER BY, its (sort_key, descending) pairs
+    def search(self, request):
+        return self.cache.get_or_compute(self.cache_key(request), lambda: self._search(request))
+
+    def _search(self, request):
+        kind = request['kind']
+        if kind == 'app_id':
+            return search_by_app_id(str(request['value']).strip(), self.games), None
+        if kind == 'name':
+            return self.substring_index.search_substring(request['value'].lower()), None
+        if kind in ('categories', 'tags'):
+            return search_by_multiple_keys(self.trees[kind], request['value'], self.games), None
+        if kind in ('price', 'release'):
+            return search_by_range(self.trees[kind], request.get('lo'), request.get('hi')), None
+        return run_query(request['text'], self.context)
+
+    # The results of request in sort_key order, ties broken by the (sort_key, descending)
+    # pairs in then, as the TUI shows them
+    def sort(self, request, sort_key, is_inverted, then=()):
+        then = tuple(tuple(key) for key in then)
+        def compute():
+            results, _ = self.search(request)
+            return sort_rows(results, sort_key, is_inverted, self.trees, self.ranks, then)
+        return self.cache.get_or_compute(('sorted', self.cache_key(request), sort_key, is_inverted, then), compute)
+
+    # {app_id: [name, release, price, positive, negative, score, total] or None}
+    def rows(self, app_ids):
+        self.refresh()
+        games = self.indexes.get('games')
+        return {str(app_id): games.get(str(app_id)) for app_id in app_ids}
+
+    def stats(self):
+        return {'indexes': self.indexes.report(), 'cache': self.cache.report()}
+
+# "python main.py --connect [ADDRESS]" uses a running Server.py instead of loading the indexes
+def connect_address(args):
+    if '--connect' not in args:
+        return None
+    rest = args[args.index('--connect') + 1:]
+    return rest[0] if rest else DEFAULT_SERVER_ADDRESS
+
+# Indexes load on first use, so a missing or unreadable file can show up at any search
+def report_load_error(error, RED, RESET):
+    if isinstance(error.error, FileNotFoundError):
+        print(f"{RED}Error: Required data file not found: {error.error.filename}. Please ensure all .bin files are in the Data directory.{RESET}")
+    else:
+        print(f"{RED}An unexpected error occurred during data loading: {error}{RESET}")
+    sys.exit(1)
+
+# With --connect, a search server that failed or went away
+def report_server_error(error, RED, RESET):
+    print(f"{RED}Error: the search server failed: {error}{RESET}")
+    sys.exit(1)
+
 def main():
     BLINK = "\033[5m"
     BLUE  = "\033[34m"
@@ -81,101 +354,109 @@ def main():
 
     # Display menu immediately
     display_menu(False, False, "", "", BLINK, BLUE, RED, RESET)
-    print(f"{BLUE}Loading data...{RESET}")
-
-    # Load main data and trees once
-    games_data = None
-    categories_tree = None
-    tags_tree = None
-    name_tree = None
-    price_tree = None
-    release_tree = None
-    review_tree = None
-    patricia = None
 
-    try:
-        with open(GAMES_BIN_PATH, 'rb') as f:
-            games_data = pickle.load(f)
-        with open(CATEGORIES_BIN_PATH, 'rb') as f:
-            categories_tree = pickle.load(f)
-        with open(TAGS_BIN_PATH, 'rb') as f:
-            tags_tree = pickle.load(f)
-        with open(NAMETREE_BIN_PATH, 'rb') as f:
-            name_tree = pickle.load(f)
-        with open(PRICETREE_BIN_PATH, 'rb') as f:
-            price_tree = pickle.load(f)
-        with open(RELEASETREE_BIN_PATH, 'rb') as f:
-            release_tree = pickle.load(f)
-        with open(REVIEWTREE_BIN_PATH, 'rb') as f:
-            review_tree = pickle.load(f)
-
-        # Load or build the SuffixTree
+    address = connect_address(sys.argv[1:])
+    if address is None:
+        # Nothing but the game table is loaded up front: every other index is loaded the first
+        # time a search or a sort needs it, and the warmup thread loads the rest in the meantime
+        indexes = build_registry()
+        try:
+            games_data = indexes.get('games')
+        except IndexLoadError as e:
+            report_load_error(e, RED, RESET)
+        if WARMUP:
+            indexes.warm(WARMUP_ORDER)
+        service = SearchService(indexes)
+    else:
         try:
-            # Load
-            patricia = SuffixTree.load_tree(PATRICIA_PATH)
-        except FileNotFoundError:
-            # Build
-            patricia = SuffixTree.build_from_csv(CSV_FILE_PATH)
-            patricia.save_tree(PATRICIA_PATH)
-        except Exception as e:
-            patricia = SuffixTree.build_from_csv(CSV_FILE_PATH)
-            patricia.save_tree(PATRICIA_PATH)
-
-    except FileNotFoundError as e:
-        print(f"{RED}Error: Required data file not found: {e.filename}. Please ensure all .bin files are in the Data directory.{RESET}")
-        sys.exit(1)
-    except Exception as e:
-        print(f"{RED}An unexpected error occurred during data loading: {e}{RESET}")
-        sys.exit(1)
-
-    trees = {
-        'categories': categories_tree,
-        'tags': tags_tree,
-        'name': name_tree,
-        'price': price_tree,
-        'release': release_tree,
-        'review': review_tree
-    }
+            service = SearchClient(address)
+        except OSError as e:
+            print(f"{RED}Error: could not connect to the search server at {address}: {e}{RESET}")
+            sys.exit(1)
+        games_data = service.games
 
     bad_option, no_results = False, False
     last_input = ""
     last_search = ""
 
     while True:
-        display_menu(bad_option, no_results, last_input, last_search, BLINK, BLUE, RED, RESET)
+        stats = service.stats()
+        display_menu(bad_option, no_results, last_input, last_search, BLINK, BLUE, RED, RESET, stats['indexes'], stats['cache'])
 
         choice = input().strip()
         last_input = choice
-        results = []
+        request = None
         match choice:
             case '1':
                 app_id = input("Enter app_id (int): ").strip()
                 last_search = app_id
-                results = search_by_app_id(app_id, games_data)
+                request = {'kind': 'app_id', 'value': app_id}
             case '2':
                 value = input("Enter name (substring search): ").strip()
                 last_search = value
-                results = patricia.search_substring(value.lower())
+                request = {'kind': 'name', 'value': value}
             case '3':
-                value = input("Enter categories (comma-separated): ").strip()
+                value = input("Enter categories (comma-separated, '|' for either, '!' to exclude): ").strip()
                 last_search = value
-                results = search_by_multiple_keys(categories_tree, value)
+                request = {'kind': 'categories', 'value': value}
             case '4':
-                value = input("Enter tags (comma-separated): ").strip()
+                value = input("Enter tags (comma-separated, '|' for either, '!' to exclude): ").strip()
+                last_search = value
+                request = {'kind': 'tags', 'value': value}
+            case '5':
+                low = input("Minimum price in R$ (empty for none): ").strip()
+                high = input("Maximum price in R$ (empty for none): ").strip()
+                last_search = f"{low}-{high}"
+                try:
+                    request = {'kind': 'price', 'lo': parse_price(low), 'hi': parse_price(high)}
+                except ValueError:
+                    pass
+            case '6':
+                low = input("Released from (YYYY or YYYY/MM/DD, empty for none): ").strip()
+                high = input("Released until (YYYY or YYYY/MM/DD, empty for none): ").strip()
+                last_search = f"{low}-{high}"
+                try:
+                    # games without a known date are stored as 100000000, keep them out of open ranges
+                    until = parse_date(high, True)
+                    request = {'kind': 'release', 'lo': parse_date(low, False), 'hi': until if until is not None else LATEST_RELEASE}
+                except ValueError:
+                    pass
+            case '7':
+                print('e.g. name:"war" AND tag:Strategy AND price<2000 AND score>0.8 ORDER BY release DESC, score DESC')
+                value = input("Enter query: ").strip()
                 last_search = value
-                results = search_by_multiple_keys(tags_tree, value)
+                request = {'kind': 'query', 'text': value}
             case 'q' | 'Q':
                 sys.exit(0)
             case _:
                 bad_option = True
                 continue
 
+        results, order = [], None
+        if request is not None:
+            try:
+                results, order = service.search(request)
+            except ValueError:
+                results = []
+            except IndexLoadError as e:
+                report_load_error(e, RED, RESET)
+            except (ServerError, ConnectionError) as e:
+                report_server_error(e, RED, RESET)
+
         if not results:
             no_results = True
             continue
 
-        # Show results in TUI, passing all necessary data
-        curses.wrapper(lambda stdscr: tui_main(stdscr, games_data, results, trees))
+        # Show results in TUI; the service sorts them (and caches each ordering) on request
+        (sort_key, is_inverted), *then = order if order else [('app_id', False)]
+        sorter = lambda app_ids, key, inverted, then=(): service.sort(request, key, inverted, then)
+        try:
+            curses.wrapper(lambda stdscr: tui_main(stdscr, games_data, results, None, None, sort_key, is_inverted,
+                                                   sorter, tuple(then)))
+        except IndexLoadError as e:  # an index the sort needed
+            report_load_error(e, RED, RESET)
+        except (ServerError, ConnectionError) as e:  # only with --connect: the pages come from the server
+            report_server_error(e, RED, RESET)
 
 if __name__ == "__main__":
     main()
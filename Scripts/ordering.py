@@ -1,18 +1,25 @@
+import os
 import pickle
 from BPlusTree import BPlusTree, BPlusNode
 from collections import defaultdict
+from GameTable import GameTable
 
 
-with open("Data/games.bin", "rb") as d:
-    d = pickle.load(d)
+# a chave é o score em ponto fixo que a games.tbl já guarda. Se ela não existe ou é mais
+# velha que o games.bin (o BinaryDict.py só grava o games.bin), converte primeiro, como o
+# load_games do main.py faz
+if not os.path.exists("Data/games.tbl") or (
+    os.path.exists("Data/games.bin") and os.path.getmtime("Data/games.tbl") < os.path.getmtime("Data/games.bin")
+):
+    with open("Data/games.bin", "rb") as f:
+        GameTable.from_dict(pickle.load(f)).save("Data/games.tbl")
+d = GameTable.load("Data/games.tbl")
 
-tree = BPlusTree(200)
-for key in d.keys():
-    try:
-        chave = d[key][3] / (d[key][3] + d[key][4])
-    except:
-        chave = 0
-    tree.insert(chave,int(key))
+pares = [(d.score[i], d.ids[i]) for i in range(len(d))]
+
+# sorted é estável, então empates continuam na ordem de app_id da tabela
+pares.sort(key=lambda par: par[0])
+tree = BPlusTree.bulk_load(pares, 200)
 
 
 with open("Data/reviewtree.bin", "wb") as f:
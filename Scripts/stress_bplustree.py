@@ -0,0 +1,122 @@
+import random
+import sys
+from collections import Counter
+from BPlusTree import BPlusTree, BPlusNode
+
+# Teste de estresse do BPlusTree: aplica inserts, deletes e updates aleatórios em árvores
+# de vários graus, nos dois formatos usados em Data/ (um app_id por entrada, como a
+# pricetree, e listas de app_ids, como tags/categorias), e depois de cada lote compara
+# com um modelo em memória e roda check_invariants().
+# Uso: python stress_bplustree.py [operações por árvore] [seed]
+DEGREES = [2, 3, 7, 25]
+CHECK_EVERY = 50
+
+
+def check_scalar(tree, model):
+    tree.check_invariants()
+    pairs = sorted(tree.range())
+    if pairs != sorted(model.elements()):
+        raise AssertionError("conteúdo da árvore diferente do modelo")
+    for key, _ in set(model):
+        if tree.search(key) is None:
+            raise AssertionError(f"search({key!r}) não achou uma chave presente")
+    lo, hi = sorted(random.choices(range(-5, 1005), k=2))
+    expected = sorted((k, v) for k, v in model.elements() if lo <= k <= hi)
+    if sorted(tree.range(lo, hi)) != expected or sorted(tree.range(lo, hi, reverse=True)) != expected:
+        raise AssertionError(f"range({lo}, {hi}) diferente do modelo")
+
+
+def check_postings(tree, model):
+    tree.check_invariants()
+    if {key: sorted(values) for key, values in tree.range()} != {k: sorted(v) for k, v in model.items() if v}:
+        raise AssertionError("postings da árvore diferentes do modelo")
+
+
+def stress_scalar(t, operations, rng):
+    # chaves de 0 a 1000 com muita repetição, como preços em centavos
+    start = sorted((rng.randint(0, 1000), app_id) for app_id in range(rng.randint(0, 400)))
+    if rng.random() < 0.5:
+        tree = BPlusTree.bulk_load(start, t)
+    else:
+        tree = BPlusTree(t)
+        for key, app_id in start:
+            tree.insert(key, app_id)
+    model = Counter(start)
+    next_id = len(start)
+
+    for step in range(1, operations + 1):
+        op = rng.random()
+        if op < 0.4 or not model:
+            key = rng.randint(0, 1000)
+            tree.insert(key, next_id)
+            model[(key, next_id)] += 1
+            next_id += 1
+        elif op < 0.8:
+            key, app_id = rng.choice(list(model))
+            if not tree.delete(key, app_id):
+                raise AssertionError(f"delete({key}, {app_id}) não achou a entrada")
+            model[(key, app_id)] -= 1
+            if not model[(key, app_id)]:
+                del model[(key, app_id)]
+        elif op < 0.95:
+            key, app_id = rng.choice(list(model))
+            new_key = rng.randint(0, 1000)
+            if not tree.update(key, new_key, app_id):
+                raise AssertionError(f"update({key}, {new_key}, {app_id}) não achou a entrada")
+            model[(key, app_id)] -= 1
+            if not model[(key, app_id)]:
+                del model[(key, app_id)]
+            model[(new_key, app_id)] += 1
+        else:
+            # delete de algo que não existe não pode mexer na árvore
+            if tree.delete(rng.randint(0, 1000), -1):
+                raise AssertionError("delete de um valor ausente retornou True")
+        if step % CHECK_EVERY == 0:
+            check_scalar(tree, model)
+
+    # esvazia tudo no fim, o que força as junções até a raiz
+    for key, app_id in list(model.elements()):
+        tree.delete(key, app_id)
+    check_scalar(tree, Counter())
+    if not tree.root.leaf:
+        raise AssertionError("árvore vazia com raiz interna")
+
+
+def stress_postings(t, operations, rng):
+    keys = [f"tag{i:03d}" for i in range(300)]
+    tree = BPlusTree(t)
+    model = {}
+    for step in range(1, operations + 1):
+        key = rng.choice(keys)
+        if rng.random() < 0.55 or not model.get(key):
+            app_id = rng.randint(0, 200)
+            tree.add(key, app_id)
+            model.setdefault(key, set()).add(app_id)
+        else:
+            app_id = rng.choice(sorted(model[key]))
+            model[key].discard(app_id)
+            if rng.random() < 0.7:
+                tree.delete(key, app_id)
+            else:
+                new_key = rng.choice(keys)
+                tree.update(key, new_key, app_id)
+                model.setdefault(new_key, set()).add(app_id)
+        if step % CHECK_EVERY == 0:
+            check_postings(tree, model)
+    check_postings(tree, model)
+
+
+def main():
+    operations = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else random.randrange(1 << 30)
+    print(f"seed {seed}")
+    rng = random.Random(seed)
+    random.seed(seed)
+    for t in DEGREES:
+        stress_scalar(t, operations, rng)
+        stress_postings(t, operations, rng)
+        print(f"t={t}: ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,112 +1,90 @@
 import curses
+import sys
+import threading
 # import csv
 # import os
 from wcwidth import wcwidth
 import pickle
 from collections import defaultdict
-
-
-
-def draw_tui(stdscr, scroll_pos, app_ids, games_data, max_y, max_x, is_inverted, sort_key):
-    stdscr.erase()
-
-    # Fixed widths for columns
-    fixed_widths = {
-        'app_id': 8,
-        'release_date': 12,
-        'price': 11,
-        'positive': 11,
-        'negative': 11,
-        'score': 6,
-        'total': 11,
-    }
-    separator = " | "
-    used_space = (
-        fixed_widths['app_id'] +
-        fixed_widths['release_date'] +
-        fixed_widths['price'] +
-        fixed_widths['positive'] +
-        fixed_widths['negative'] +
-        fixed_widths['score'] +
-        fixed_widths['total'] +
-        7 * len(separator)
-    )
-    name_width = max(10, max_x - used_space - 1)
-
-    # --- Display Header ---
+from functools import lru_cache
+from GameTable import format_price, format_date, format_score, review_score
+
+
+
+# Fixed widths for columns
+FIXED_WIDTHS = {
+    'app_id': 8,
+    'release_date': 12,
+    'price': 11,
+    'positive': 11,
+    'negative': 11,
+    'score': 6,
+    'total': 11,
+}
+SEPARATOR = " | "
+# Rendered rows kept per TUI session before the cache starts over
+ROW_CACHE_MAX = 4096
+
+def name_width_for(max_x):
+    used_space = sum(FIXED_WIDTHS.values()) + 7 * len(SEPARATOR)
+    return max(10, max_x - used_space - 1)
+
+def header_line(max_x):
+    name_width = name_width_for(max_x)
     header_template = (
-        f"{{:<{fixed_widths['app_id']}}}{separator}"
-        f"{{:<{name_width}}}{separator}"
-        f"{{:<{fixed_widths['release_date']}}}{separator}"
-        f"{{:<{fixed_widths['price']}}}{separator}"
-        f"{{:<{fixed_widths['positive']}}}{separator}"
-        f"{{:<{fixed_widths['negative']}}}{separator}"
-        f"{{:<{fixed_widths['score']}}}{separator}"
-        f"{{:<{fixed_widths['total']}}}"
+        f"{{:<{FIXED_WIDTHS['app_id']}}}{SEPARATOR}"
+        f"{{:<{name_width}}}{SEPARATOR}"
+        f"{{:<{FIXED_WIDTHS['release_date']}}}{SEPARATOR}"
+        f"{{:<{FIXED_WIDTHS['price']}}}{SEPARATOR}"
+        f"{{:<{FIXED_WIDTHS['positive']}}}{SEPARATOR}"
+        f"{{:<{FIXED_WIDTHS['negative']}}}{SEPARATOR}"
+        f"{{:<{FIXED_WIDTHS['score']}}}{SEPARATOR}"
+        f"{{:<{FIXED_WIDTHS['total']}}}"
     )
     header_text = header_template.format('app_id', 'name', 'release_date', 'price', 'positive', 'negative', 'score', 'total')
-    if len(header_text) > max_x:
-        header_text = header_text[:max_x]
-    stdscr.addstr(0, 0, header_text, curses.A_REVERSE)
-
-    # --- Display Data Rows ---
-    displayable_rows = max_y - 2 # For header and footer
-    ids_to_display = app_ids[scroll_pos : scroll_pos + displayable_rows]
-
-    for i, app_id in enumerate(ids_to_display):
-        if i + 1 >= max_y - 1:
-            break
-        
-        row = games_data.get(str(app_id))
-        if not row:
-            continue
-
-        price_raw = row[2]
-        if price_raw == r'\N':
-            formatted_price = ""
-        else:
-            try:
-                price_float = int(price_raw) / 100
-                formatted_price = f"R$ {price_float:.2f}".replace('.', ',')
-            except (ValueError, IndexError):
-                formatted_price = price_raw
-
-        release_date_str = str(row[1])
-        if len(release_date_str) == 8:
-            release_date = f"{release_date_str[:4]}/{release_date_str[4:6]}/{release_date_str[6:]}"
-        else:
-            release_date = ""
-
-        try:
-            pos = int(row[3])
-            neg = int(row[4])
-            total = pos + neg
-            score = f"{(pos / total * 100):.1f}%" if total > 0 else "-"
-            total_str = str(total)
-        except Exception:
-            score = "-"
-            total_str = "-"
-
-        row_data = (
-            fit_to_display_width(str(app_id), fixed_widths['app_id']) + separator +
-            fit_to_display_width(str(row[0]), name_width) + separator +
-            fit_to_display_width(str(release_date), fixed_widths['release_date']) + separator +
-            fit_to_display_width(str(formatted_price), fixed_widths['price']) + separator +
-            fit_to_display_width(str(row[3]), fixed_widths['positive']) + separator +
-            fit_to_display_width(str(row[4]), fixed_widths['negative']) + separator +
-            fit_to_display_width(str(score), fixed_widths['score']) + separator +
-            fit_to_display_width(str(total_str), fixed_widths['total'])
-        )
-
-        if len(row_data) > max_x:
-            row_data = row_data[:max_x - 1]
-
-        try:
-            stdscr.addstr(i + 1, 0, row_data)
-        except curses.error:
-            pass
+    return header_text[:max_x]
+
+def format_row(app_id, row, max_x):
+    # rows are [name, release, price, positive, negative, score, total]; the last two are
+    # precomputed by the game table and only derived here for rows that don't carry them
+    name_width = name_width_for(max_x)
+    formatted_price = format_price(row[2])
+    release_date = format_date(row[1])
+    if len(row) > 6:
+        score_fp, total = row[5], row[6]
+    else:
+        score_fp, total = review_score(row[3], row[4]), row[3] + row[4]
+    score = format_score(score_fp, total)
+    total_str = str(total)
+
+    row_data = (
+        fit_to_display_width(str(app_id), FIXED_WIDTHS['app_id']) + SEPARATOR +
+        fit_to_display_width(str(row[0]), name_width) + SEPARATOR +
+        fit_to_display_width(str(release_date), FIXED_WIDTHS['release_date']) + SEPARATOR +
+        fit_to_display_width(str(formatted_price), FIXED_WIDTHS['price']) + SEPARATOR +
+        fit_to_display_width(str(row[3]), FIXED_WIDTHS['positive']) + SEPARATOR +
+        fit_to_display_width(str(row[4]), FIXED_WIDTHS['negative']) + SEPARATOR +
+        fit_to_display_width(str(score), FIXED_WIDTHS['score']) + SEPARATOR +
+        fit_to_display_width(str(total_str), FIXED_WIDTHS['total'])
+    )
 
-    # --- Display Footer/Status Bar ---
+    if len(row_data) > max_x:
+        row_data = row_data[:max_x - 1]
+    return row_data
+
+# Sort keys by their TUI key; the uppercase letter adds the key as a tie-breaker
+SORT_KEY_MAP = {
+    ord('a'): 'app_id',
+    ord('n'): 'name',
+    ord('p'): 'price',
+    ord('d'): 'release_date',
+    ord('s'): 'score',
+    ord('t'): 'total'
+}
+TIE_BREAK_KEY_MAP = {ord(chr(key).upper()): sort_key for key, sort_key in SORT_KEY_MAP.items()}
+SORT_LABELS = {'app_id': 'AppID', 'name': 'Name', 'price': 'Price', 'release_date': 'Date', 'score': 'Score', 'total': 'Total'}
+
+def status_line(scroll_pos, app_ids, max_x, is_inverted, sort_key, note="", then=()):
     sort_order = "DESCENDING" if is_inverted else "ASCENDING"
 
     sort_keys = {
@@ -114,7 +92,8 @@ def draw_tui(stdscr, scroll_pos, app_ids, games_data, max_y, max_x, is_inverted,
         'n': 'Name',
         'p': 'Price',
         'd': 'Date',
-        's': 'Score'
+        's': 'Score',
+        't': 'Total'
     }
     key_display = []
     for k, label in sort_keys.items():
@@ -123,7 +102,8 @@ def draw_tui(stdscr, scroll_pos, app_ids, games_data, max_y, max_x, is_inverted,
             (k == 'n' and sort_key == 'name') or
             (k == 'p' and sort_key == 'price') or
             (k == 'd' and sort_key == 'release_date') or
-            (k == 's' and sort_key == 'score')
+            (k == 's' and sort_key == 'score') or
+            (k == 't' and sort_key == 'total')
         ):
             key_display.append(f"[{label.upper()}]")
         else:
@@ -133,7 +113,11 @@ def draw_tui(stdscr, scroll_pos, app_ids, games_data, max_y, max_x, is_inverted,
         f"Rows {scroll_pos+1}-{scroll_pos+len(app_ids)} of {len(app_ids)} | "
         f"Sort: {' '.join(key_display)} | Invert ({sort_order})"
     )
-    right_text = "[q/esc] Quit"
+    if then:
+        left_text += " | Then: " + ", ".join(SORT_LABELS[key] + (" desc" if descending else "") for key, descending in then)
+    if note:
+        left_text += f" | {note}"
+    right_text = "[:] Go to row [q/esc] Quit"
 
     total_length = len(left_text) + len(right_text)
     if total_length < max_x:
@@ -142,41 +126,196 @@ def draw_tui(stdscr, scroll_pos, app_ids, games_data, max_y, max_x, is_inverted,
         left_text = left_text[:max_x - len(right_text) - 1]
         padding = ""
 
-    status_text = f"{left_text}{padding}{right_text}"
+    return f"{left_text}{padding}{right_text}"
+
+class Renderer:
+    """Remembers what is on screen so draw_tui only writes the lines that changed. Rows
+    are formatted once per (app_id, terminal width), and scrolling by a few rows shifts
+    the lines already drawn (the terminal does it with its own scroll, thanks to idlok)
+    instead of repainting all of them."""
+    def __init__(self):
+        self.rows = {}
+        self.reset()
+
+    # Forget the screen contents, e.g. after a resize; the next draw repaints everything
+    def reset(self):
+        self.lines = None
+        self.size = None
+        self.source = None
+        self.scroll_pos = None
+
+    def forget(self, y):
+        if self.lines is not None and y < len(self.lines):
+            self.lines[y] = None
+
+    def row(self, app_id, games_data, max_x):
+        key = (app_id, max_x)
+        text = self.rows.get(key)
+        if text is None:
+            row = games_data.get(str(app_id))
+            text = format_row(app_id, row, max_x) if row else ""
+            if len(self.rows) >= ROW_CACHE_MAX:
+                self.rows.clear()
+            self.rows[key] = text
+        return text
+
+def draw_tui(stdscr, scroll_pos, app_ids, games_data, max_y, max_x, is_inverted, sort_key, renderer=None, note="", then=()):
+    if renderer is None:
+        renderer = Renderer()
+    displayable_rows = max_y - 2 # For header and footer
 
-    try:
-        stdscr.addstr(max_y - 1, 0, status_text, curses.A_REVERSE)
-    except curses.error:
-        pass
+    # --- Build the frame: header, data rows, footer/status bar ---
+    ids_to_display = app_ids[scroll_pos : scroll_pos + displayable_rows]
+    lines = [header_line(max_x)]
+    lines += [renderer.row(app_id, games_data, max_x) for app_id in ids_to_display]
+    lines += [""] * (max_y - 1 - len(lines))
+    lines.append(status_line(scroll_pos, app_ids, max_x, is_inverted, sort_key, note, then))
+
+    if renderer.lines is None or renderer.size != (max_y, max_x):
+        stdscr.erase()
+        previous = [None] * max_y
+    else:
+        previous = renderer.lines
+        # Same rows scrolled by less than a screen: shift what is drawn and only fill the gap
+        shift = scroll_pos - renderer.scroll_pos if renderer.source is app_ids else 0
+        if shift and abs(shift) < displayable_rows:
+            try:
+                stdscr.setscrreg(1, max_y - 2)
+                stdscr.scrollok(True)
+                stdscr.scroll(shift)
+                stdscr.scrollok(False)
+                stdscr.setscrreg(0, max_y - 1)
+                body = previous[1:max_y - 1]
+                body = body[shift:] + [""] * shift if shift > 0 else [""] * -shift + body[:shift]
+                previous = [previous[0]] + body + [previous[-1]]
+            except curses.error:
+                previous = [None] * max_y
+
+    for y, text in enumerate(lines):
+        if text == previous[y]:
+            continue
+        attr = curses.A_REVERSE if y == 0 or y == max_y - 1 else curses.A_NORMAL
+        try:
+            stdscr.move(y, 0)
+            stdscr.clrtoeol()
+            if text:
+                stdscr.addstr(y, 0, text, attr)
+        except curses.error:
+            pass # the bottom right cell can't be written without scrolling
 
+    renderer.lines = lines
+    renderer.size = (max_y, max_x)
+    renderer.source = app_ids
+    renderer.scroll_pos = scroll_pos
     stdscr.refresh()
 
+# Display width of each character of a name, computed once per name
+@lru_cache(maxsize=16384)
+def _char_widths(text):
+    return tuple(max(wcwidth(ch), 0) for ch in text)
+
 def fit_to_display_width(text, max_width):
+    # Plain ascii names are one column per character; only the rest go through wcwidth
+    if text.isascii() and text.isprintable():
+        return text[:max_width].ljust(max_width)
     # In the edge case that the terminal is too small
     acc = 0
-    result = ''
-    
-    for ch in text:
-        w = wcwidth(ch)
-        if w < 0:
-            w = 0
+    end = 0
+    for w in _char_widths(text):
         if acc + w > max_width:
             break
-        result += ch
         acc += w
+        end += 1
     # Pad if needed
-    if acc < max_width:
-        result += ' ' * (max_width - acc)
-    return result
-
-def sort_rows(app_ids, sort_key, is_inverted, trees):
+    return text[:end] + ' ' * (max_width - acc)
+
+# Result sets larger than this are sorted lazily, only as far as the screen has scrolled
+LAZY_SORT_MIN = 2000
+# How many entries of an ordering LazySortedRows checks per step
+WALK_CHUNK = 4096
+
+class LazySortedRows:
+    """Sorted app_ids (as strings) produced by walking a precomputed ordering only as
+    far as the rows asked for so far, so the first screen of a broad search doesn't
+    wait for the whole result set to be sorted. Games missing from the ordering are
+    placed at the end in both directions."""
+    def __init__(self, app_ids, order, reverse=False):
+        self._ids = set(app_ids)  # ints
+        self._pending = set(self._ids)
+        self._order = order
+        self._reverse = reverse
+        self._cursor = 0
+        self._rows = []
+        # the sort worker fills the first screen before handing the rows to the UI thread,
+        # and a cached instance can be handed out again while it is on screen
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._ids)
+
+    def _fill(self, count):
+        with self._lock:
+            self._fill_locked(count)
+
+    def _fill_locked(self, count):
+        order, pending, rows = self._order, self._pending, self._rows
+        size = len(order)
+        while len(rows) < count and pending and self._cursor < size:
+            if self._reverse:
+                chunk = order[max(0, size - self._cursor - WALK_CHUNK):size - self._cursor][::-1]
+            else:
+                chunk = order[self._cursor:self._cursor + WALK_CHUNK]
+            self._cursor += WALK_CHUNK
+            found = [app_id for app_id in chunk if app_id in pending]
+            pending.difference_update(found)
+            rows.extend(str(app_id) for app_id in found)
+        if len(rows) < count and pending and self._cursor >= size:
+            rows.extend(str(app_id) for app_id in sorted(pending))
+            pending.clear()
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            self._fill(stop if step > 0 else len(self))
+            return self._rows[index]
+        self._fill(index + 1 if index >= 0 else len(self))
+        return self._rows[index]
+
+    def inverted(self):
+        return LazySortedRows(self._ids, self._order, not self._reverse)
+
+    def memory_size(self):
+        # for the query cache: the id sets plus every row filled, as rows keep filling
+        # after the object is cached
+        return sys.getsizeof(self._ids) * 2 + len(self._ids) * (sys.getsizeof(0) + sys.getsizeof('0000000') + 8)
+
+# then: further (sort_key, descending) keys that break ties of sort_key, e.g. price then score
+def sort_rows(app_ids, sort_key, is_inverted, trees, ranks=None, then=()):
     # Standardize app_ids to integers for reliable sorting and lookups
     int_app_ids = [int(a) for a in app_ids]
 
+    # Several keys go through the rank index's per-game key arrays. Without them the
+    # tie-breakers can't be applied, and an order without them is not what was asked for.
+    if then:
+        keys = [(sort_key, is_inverted)] + list(then)
+        values = getattr(ranks, 'values', None) if ranks is not None else None
+        unknown = [key for key, _ in keys if key != 'app_id' and (values is None or key not in values)]
+        if unknown:
+            raise ValueError(f"can't break ties by {', '.join(unknown)}")
+        return [str(i) for i in ranks.sort_by(int_app_ids, keys)]
+
     if sort_key == 'app_id':
         sorted_ids = sorted(int_app_ids, reverse=is_inverted)
         return [str(i) for i in sorted_ids]
 
+    # With the rank index only the result set gets sorted, no tree walk needed
+    if ranks is not None and sort_key in ranks:
+        if len(int_app_ids) > LAZY_SORT_MIN:
+            return LazySortedRows(int_app_ids, ranks.orders[sort_key], is_inverted)
+        # same order as the lazy walk: missing games last in both directions
+        sorted_ids = ranks.sort(int_app_ids, sort_key, is_inverted)
+        return [str(i) for i in sorted_ids]
+
     tree_map = {
         'name': trees['name'],
         'price': trees['price'],
@@ -198,62 +337,245 @@ def sort_rows(app_ids, sort_key, is_inverted, trees):
     sorted_ids = sorted(int_app_ids, reverse=is_inverted)
     return [str(i) for i in sorted_ids]
 
-def main(stdscr, games_data, app_ids, trees):
+# Rows the sort worker reads ahead so the first screen of a new order is ready when it is shown
+SORT_PREFETCH = 256
+# How long a key press waits for its sort before the current order stays up with a status note
+SORT_WAIT = 0.05
+# getch timeout (ms) while a sort is running, to pick up the result; otherwise getch blocks
+SORT_POLL_MS = 50
+
+class SortWorker:
+    """Runs the sorter on a daemon thread so the TUI keeps scrolling the current order.
+    Only the newest request matters: a request replaces any that hasn't started yet, and
+    the result of one that was superseded while it ran is dropped instead of shown."""
+    def __init__(self, sorter, app_ids):
+        self._sorter = sorter
+        self._app_ids = app_ids
+        self._cond = threading.Condition()
+        self._generation = 0
+        self._queued = None     # (generation, sort_key, is_inverted, then) waiting for the thread
+        self._result = None     # (sort_key, is_inverted, then, rows, error) of the newest request
+        self._closed = False
+        self.pending = None     # (sort_key, is_inverted, then) asked for and not taken yet
+        self._thread = threading.Thread(target=self._run, name="tui-sort", daemon=True)
+        self._thread.start()
+
+    def request(self, sort_key, is_inverted, then=()):
+        with self._cond:
+            self._generation += 1
+            self._queued = (self._generation, sort_key, is_inverted, then)
+            self._result = None
+            self.pending = (sort_key, is_inverted, then)
+            self._cond.notify_all()
+
+    def cancel(self):
+        with self._cond:
+            self._generation += 1
+            self._queued = None
+            self._result = None
+            self.pending = None
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._queued = None
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queued is not None or self._closed)
+                if self._closed:
+                    return
+                generation, sort_key, is_inverted, then = self._queued
+                self._queued = None
+            rows, error = None, None
+            try:
+                rows = self._sorter(self._app_ids, sort_key, is_inverted, then)
+                rows[:SORT_PREFETCH] # fill the first screen here, not on the UI thread
+            except Exception as e:
+                error = e
+            with self._cond:
+                if generation == self._generation:
+                    self._result = (sort_key, is_inverted, then, rows, error)
+                    self._cond.notify_all()
+
+    # Blocks until the newest request is done, for at most timeout seconds
+    def wait(self, timeout=None):
+        with self._cond:
+            self._cond.wait_for(lambda: self._result is not None or self.pending is None, timeout)
+
+    # (sort_key, is_inverted, then, rows) of the newest request once it is done, otherwise None.
+    # A sort that failed raises here, on the UI thread.
+    def take(self):
+        with self._cond:
+            if self._result is None:
+                return None
+            sort_key, is_inverted, then, rows, error = self._result
+            self._result = None
+            self.pending = None
+        if error is not None:
+            raise error
+        return sort_key, is_inverted, then, rows
+
+def read_row_number(stdscr, max_y, max_x, renderer):
+    """Reads a row number typed on the status line; None if it was cancelled with esc."""
+    digits = ''
+    while True:
+        try:
+            stdscr.move(max_y - 1, 0)
+            stdscr.clrtoeol()
+            stdscr.addstr(max_y - 1, 0, f"Go to row: {digits}"[:max_x - 1], curses.A_REVERSE)
+        except curses.error:
+            pass
+        stdscr.refresh()
+        key = stdscr.getch()
+        if key in [curses.KEY_ENTER, 10, 13]:
+            break
+        if key == 27 or key == curses.KEY_RESIZE:
+            digits = ''
+            break
+        if key in [curses.KEY_BACKSPACE, 127, 8]:
+            digits = digits[:-1]
+        elif ord('0') <= key <= ord('9') and len(digits) < 12:
+            digits += chr(key)
+    # the status line now shows the prompt, so the next draw has to write it again
+    renderer.forget(max_y - 1)
+    return int(digits) if digits else None
+
+# sorter(app_ids, sort_key, is_inverted, then) replaces sort_rows, e.g. with main.py's search service
+def main(stdscr, games_data, app_ids, trees, ranks=None, sort_key='app_id', is_inverted=False, sorter=None, then=()):
     """Main function to run the TUI event loop."""
     curses.curs_set(0)
     curses.start_color()
     curses.use_default_colors()
-    stdscr.nodelay(True)
+    curses.set_escdelay(25)
+    # let curses scroll with the terminal's insert/delete line instead of repainting
+    stdscr.idlok(True)
+    renderer = Renderer()
     
     scroll_pos = 0
-    is_inverted = False
-    sort_key = 'app_id'
     
-    # Initial sort based on the default key
-    sorted_app_ids = sort_rows(app_ids, sort_key, is_inverted, trees)
+    if sorter is None:
+        sorter = lambda app_ids, sort_key, is_inverted, then=(): sort_rows(app_ids, sort_key, is_inverted, trees, ranks, then)
+
+    # Initial sort based on the requested keys. Tie-breakers the sorter can't apply are
+    # dropped with a note, so the status line only lists the keys really used.
+    then = tuple(then)
+    message = ""
+    try:
+        sorted_app_ids = sorter(app_ids, sort_key, is_inverted, then)
+    except ValueError as e:
+        if not then:
+            raise
+        then, message = (), str(e)
+        sorted_app_ids = sorter(app_ids, sort_key, is_inverted, then)
+    # Later sorts run on the worker; sort_key, is_inverted and then describe the order on screen
+    worker = SortWorker(sorter, app_ids)
+
+    def sort_note():
+        if worker.pending is None:
+            return message
+        pending_key, pending_inverted, _ = worker.pending
+        return f"sorting by {SORT_LABELS[pending_key]}{' desc' if pending_inverted else ''}..."
 
     try:
         max_y, max_x = stdscr.getmaxyx()
-        draw_tui(stdscr, scroll_pos, sorted_app_ids, games_data, max_y, max_x, is_inverted, sort_key)
+        draw_tui(stdscr, scroll_pos, sorted_app_ids, games_data, max_y, max_x, is_inverted, sort_key, renderer,
+                 sort_note(), then)
     except curses.error:
         pass
 
-    while True:
-        key = stdscr.getch()
+    try:
+        while True:
+            # only wake up without a key while a sort is on its way
+            stdscr.timeout(SORT_POLL_MS if worker.pending is not None else -1)
+            key = stdscr.getch()
 
-        if key != -1:
-            if key == curses.KEY_RESIZE:
+            max_y, max_x = stdscr.getmaxyx()
+            displayable_rows = max(1, max_y - 2)
+            last_pos = max(0, len(sorted_app_ids) - displayable_rows)
+
+            if key != -1:
+                message = "" # a note stays up until the next key
+
+            if key == -1:
                 pass
+            elif key == curses.KEY_RESIZE:
+                # getmaxyx already reports the new size; lay out again from scratch
+                renderer.reset()
+                scroll_pos = min(scroll_pos, last_pos)
             elif key == ord('q') or key == 27:
                 break
             elif key == ord('i'):
-                is_inverted = not is_inverted
-                sorted_app_ids = sort_rows(app_ids, sort_key, is_inverted, trees)
-                scroll_pos = 0
-            elif key in [ord('a'), ord('n'), ord('p'), ord('d'), ord('s')]:
-                key_map = {
-                    ord('a'): 'app_id',
-                    ord('n'): 'name',
-                    ord('p'): 'price',
-                    ord('d'): 'release_date',
-                    ord('s'): 'score'
-                }
-                sort_key = key_map[key]
-                sorted_app_ids = sort_rows(app_ids, sort_key, is_inverted, trees)
-                scroll_pos = 0
+                if worker.pending is not None:
+                    # a sort is still running: ask for the other direction of it instead
+                    pending_key, pending_inverted, pending_then = worker.pending
+                    worker.request(pending_key, not pending_inverted, pending_then)
+                    worker.wait(SORT_WAIT)
+                elif then or not hasattr(sorted_app_ids, 'inverted'):
+                    # only the first key changes direction, the tie-breakers keep theirs. A plain
+                    # list is sorted again too: read backwards it would put the games missing
+                    # from the ordering first, and they stay last in both directions.
+                    worker.request(sort_key, not is_inverted, then)
+                    worker.wait(SORT_WAIT)
+                else:
+                    is_inverted = not is_inverted
+                    # The inverted order is exactly the current one backwards, no need to sort again
+                    sorted_app_ids = sorted_app_ids.inverted()
+                    scroll_pos = 0
+            elif key in SORT_KEY_MAP or key in TIE_BREAK_KEY_MAP:
+                wanted = worker.pending if worker.pending is not None else (sort_key, is_inverted, then)
+                wanted_key, wanted_inverted, wanted_then = wanted
+                if key in SORT_KEY_MAP:
+                    # a new first key drops the tie-breakers
+                    wanted = (SORT_KEY_MAP[key], wanted_inverted, ())
+                else:
+                    # uppercase adds the key as the last tie-breaker, or flips it if it is one already
+                    extra = TIE_BREAK_KEY_MAP[key]
+                    if extra != wanted_key:
+                        keys = dict(wanted_then)
+                        keys[extra] = not keys[extra] if extra in keys else False
+                        wanted = (wanted_key, wanted_inverted, tuple(keys.items()))
+                if wanted == (sort_key, is_inverted, then):
+                    worker.cancel() # back to the order already on screen
+                else:
+                    worker.request(*wanted)
+                    # quick sorts swap in right away, without a "sorting" frame in between
+                    worker.wait(SORT_WAIT)
             elif key in [curses.KEY_DOWN, ord('j')]:
-                max_y, _ = stdscr.getmaxyx()
-                displayable_rows = max(1, max_y - 2)
-                if scroll_pos < len(sorted_app_ids) - displayable_rows:
-                    scroll_pos += 1
+                scroll_pos = min(last_pos, scroll_pos + 1)
             elif key in [curses.KEY_UP, ord('k')]:
-                if scroll_pos > 0:
-                    scroll_pos -= 1
+                scroll_pos = max(0, scroll_pos - 1)
+            elif key in [curses.KEY_NPAGE, ord(' ')]:
+                scroll_pos = min(last_pos, scroll_pos + displayable_rows)
+            elif key == curses.KEY_PPAGE:
+                scroll_pos = max(0, scroll_pos - displayable_rows)
+            elif key in [curses.KEY_HOME, ord('g')]:
+                scroll_pos = 0
+            elif key in [curses.KEY_END, ord('G')]:
+                scroll_pos = last_pos
+            elif key == ord(':'):
+                row = read_row_number(stdscr, max_y, max_x, renderer)
+                if row is not None:
+                    scroll_pos = min(last_pos, max(0, row - 1))
+
+            # swap in a finished sort all at once; until then the old order keeps scrolling.
+            # One that can't be done (e.g. tie-breakers without the rank index) leaves the
+            # current order on screen and says why.
+            try:
+                done = worker.take()
+            except ValueError as e:
+                done, message = None, str(e)
+            if done is not None:
+                sort_key, is_inverted, then, sorted_app_ids = done
+                scroll_pos = 0
 
             try:
                 max_y, max_x = stdscr.getmaxyx()
-                draw_tui(stdscr, scroll_pos, sorted_app_ids, games_data, max_y, max_x, is_inverted, sort_key)
+                draw_tui(stdscr, scroll_pos, sorted_app_ids, games_data, max_y, max_x, is_inverted, sort_key,
+                         renderer, sort_note(), then)
             except curses.error:
                 pass
-
-        curses.napms(10)
+    finally:
+        worker.close()